@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,22 +41,36 @@ INSTALLED_APPS = [
     "corsheaders",
     "home.apps.HomeConfig",
     "rest_framework",
-    "rest_framework.authtoken",
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Add this line
+        # Token auth that also loads the user's HOD/Student row in the same query
+        'home.authentication.RoleTokenAuthentication',
     ],
 }
 
+# Login tokens (home.models.AuthToken) are replaced on every login and expire after
+# CBCS_TOKEN_LIFETIME seconds; `manage.py purgetokens` deletes expired ones.
+CBCS_TOKEN_LIFETIME = int(os.environ.get('CBCS_TOKEN_LIFETIME', 60 * 60 * 24 * 7))
+
+# Authenticated tokens are cached per process (LRU, entries live CBCS_TOKEN_CACHE_TTL
+# seconds) or, when CBCS_TOKEN_SHARED_CACHE names a CACHES alias shared by all processes
+# (e.g. redis), in that cache. Without a shared cache, revoking a token (revoketokens,
+# deleting it, logging in again elsewhere) or changing a user only reaches other
+# processes once their entry expires, i.e. after up to CBCS_TOKEN_CACHE_TTL seconds.
+CBCS_TOKEN_CACHE_SIZE = 10000
+CBCS_TOKEN_CACHE_TTL = 300
+CBCS_TOKEN_SHARED_CACHE = os.environ.get('CBCS_TOKEN_SHARED_CACHE') or None
+
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',  # Default backend
 ]
 
 MIDDLEWARE = [
+    'home.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +79,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
+    'home.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'CBCSB.urls'
@@ -89,17 +105,92 @@ WSGI_APPLICATION = 'CBCSB.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
+# Connections are kept open for CBCS_DB_CONN_MAX_AGE seconds (health-checked before
+# reuse). Setting CBCS_DB_POOL_MAX_SIZE switches to an in-process psycopg 3 pool
+# instead. CBCS_DB_ENGINE=sqlite runs against a local SQLite file, e.g. for tests.
+
+if os.environ.get('CBCS_DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('CBCS_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('CBCS_DB_NAME', 'CBCS'),
+            'USER': os.environ.get('CBCS_DB_USER', 'Titan'),
+            'PASSWORD': os.environ.get('CBCS_DB_PASSWORD', 'titan004'),
+            'HOST': os.environ.get('CBCS_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('CBCS_DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('CBCS_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('CBCS_DB_POOL_MAX_SIZE'):
+        # Django hands connections back to the pool itself, so persistent
+        # connections must be off when pooling
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('CBCS_DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['CBCS_DB_POOL_MAX_SIZE']),
+            'timeout': float(os.environ.get('CBCS_DB_POOL_TIMEOUT', 10)),
+            'max_idle': float(os.environ.get('CBCS_DB_POOL_MAX_IDLE', 600)),
+        }
+
+
+# Cache
+# CBCS_CACHE_BACKEND selects locmem (default), file or redis; CBCS_CACHE_LOCATION is
+# the locmem name, the cache directory or the redis URL respectively.
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'CBCS',
-        'USER': 'Titan',
-        'PASSWORD': 'titan004',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'BACKEND': CACHE_BACKENDS[os.environ.get('CBCS_CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.environ.get('CBCS_CACHE_LOCATION', 'cbcs'),
     }
 }
 
+# Catalog responses (programs, courses, batches) are cached in this alias and
+# invalidated by home/signals.py whenever the underlying rows change.
+CBCS_CATALOG_CACHE = 'default'
+CBCS_CATALOG_CACHE_TIMEOUT = 60 * 60
+
+
+# Password hashing
+# CBCS_PASSWORD_HASHER picks the hasher for new passwords (pbkdf2, argon2 or bcrypt;
+# argon2 needs argon2-cffi and bcrypt needs bcrypt installed). The others stay
+# listed so existing hashes verify and are upgraded on the next login. Unset
+# cost variables keep Django's defaults.
+
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'home.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'home.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'home.hashers.TunedBCryptSHA256PasswordHasher',
+}
+CBCS_PASSWORD_HASHER = os.environ.get('CBCS_PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[CBCS_PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != CBCS_PASSWORD_HASHER
+]
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+CBCS_PBKDF2_ITERATIONS = _env_int('CBCS_PBKDF2_ITERATIONS')
+CBCS_ARGON2_TIME_COST = _env_int('CBCS_ARGON2_TIME_COST')
+CBCS_ARGON2_MEMORY_COST = _env_int('CBCS_ARGON2_MEMORY_COST')
+CBCS_ARGON2_PARALLELISM = _env_int('CBCS_ARGON2_PARALLELISM')
+CBCS_BCRYPT_ROUNDS = _env_int('CBCS_BCRYPT_ROUNDS')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -137,7 +228,66 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (queued import spreadsheets)
+
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Bulk imports
+# Rows per bulk INSERT/savepoint when importing spreadsheets (see home/importers.py)
+
+CBCS_IMPORT_CHUNK_SIZE = 500
+
+# Worker processes used to hash passwords of bulk-imported users
+
+CBCS_HASH_WORKERS = int(os.environ.get("CBCS_HASH_WORKERS", os.cpu_count() or 1))
+
+# Background import jobs
+# Set async=true on an upload to queue it; `python manage.py runjobs` processes the queue
+
+CBCS_JOB_POLL_INTERVAL = 2
+# Running jobs whose worker has not reported progress for this many seconds are failed as abandoned
+CBCS_JOB_STALE_AFTER = int(os.environ.get("CBCS_JOB_STALE_AFTER", 60 * 60))
+
+# Enrollment rules (see home/rules.py)
+# Most credits a student may enroll in for one semester
+
+CBCS_MAX_SEMESTER_CREDITS = int(os.environ.get("CBCS_MAX_SEMESTER_CREDITS", 30))
+
+# Streamed responses (?stream=json|ndjson)
+# Rows fetched and serialized per chunk when streaming large listings
+
+CBCS_STREAM_CHUNK_SIZE = 2000
+
+# Per-request SQL instrumentation (home/middleware.py)
+# Off unless CBCS_QUERY_INSTRUMENTATION is set; adds a Server-Timing header and logs
+# one JSON line per request, at WARNING when a request crosses either threshold.
+
+CBCS_QUERY_INSTRUMENTATION = os.environ.get("CBCS_QUERY_INSTRUMENTATION", "").lower() in ("1", "true", "yes")
+CBCS_SLOWEST_QUERIES = int(os.environ.get("CBCS_SLOWEST_QUERIES", 5))
+CBCS_SLOW_REQUEST_MS = int(os.environ.get("CBCS_SLOW_REQUEST_MS", 500))
+CBCS_SLOW_REQUEST_QUERIES = int(os.environ.get("CBCS_SLOW_REQUEST_QUERIES", 50))
+
+# On-demand profiling (home/middleware.py)
+# Requests to CBCS_PROFILE_VIEWS carrying CBCS_PROFILE_TOKEN (X-CBCS-Profile header or
+# ?profile=) are profiled into CBCS_PROFILE_DIR, at most once per CBCS_PROFILE_INTERVAL seconds.
+
+CBCS_PROFILE_TOKEN = os.environ.get("CBCS_PROFILE_TOKEN", "")
+CBCS_PROFILE_DIR = os.environ.get("CBCS_PROFILE_DIR", BASE_DIR / "profiles")
+CBCS_PROFILE_INTERVAL = int(os.environ.get("CBCS_PROFILE_INTERVAL", 60))
+CBCS_PROFILE_VIEWS = ["studDashBoard", "HodDashBoard", "StudentRegisterBulk", "CourseUploadBluk"]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'home.middleware': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
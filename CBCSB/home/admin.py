@@ -1,11 +1,12 @@
 from django.contrib import admin
-from . import models
+from . import authentication, cache, models
 # Register your models here.
 
 @admin.register(models.Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ["name","id"]
     search_fields = ["name"]
+    list_select_related = ["hod"]
 
 @admin.register(models.Batch)
 class BatchAdmin(admin.ModelAdmin):
@@ -19,11 +20,13 @@ class ProgramAdmin(admin.ModelAdmin):
     list_display = ["name", "department", "duration","id"]
     search_fields = ["name", "department__name"]
     list_filter = ["department"]
+    list_select_related = ["department__hod"]
     
 @admin.register(models.Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ['username',"first_name","last_name",'department',"batch","sem",'joined_date',]
     list_filter = ['department','sem',"batch"]
+    list_select_related = ["department__hod", "batch"]
     
     search_fields = ["username", "email", "department__name"]
     
@@ -39,52 +42,73 @@ class StudentAdmin(admin.ModelAdmin):
         # 'changeBatch',
     ]
     
-    def Set_Semester_1(slef,request,queryset):
-        queryset.update(sem=1)
+    def Set_Semester_1(self,request,queryset):
+        self.update_students(queryset, sem=1)
     def Set_Semester_2(self,request,queryset):
-        queryset.update(sem=2)
+        self.update_students(queryset, sem=2)
     def Set_Semester_3(self,request,queryset):
-        queryset.update(sem=3)
+        self.update_students(queryset, sem=3)
     def Set_Semester_4(self,request,queryset):
-        queryset.update(sem=4)
+        self.update_students(queryset, sem=4)
     def Set_Semester_5(self,request,queryset):
-        queryset.update(sem=5)
+        self.update_students(queryset, sem=5)
     def Set_Semester_6(self,request,queryset):
-        queryset.update(sem=6)
+        self.update_students(queryset, sem=6)
     def Set_Semester_7(self,request,queryset):
-        queryset.update(sem=7)
+        self.update_students(queryset, sem=7)
     def Set_Semester_8(self,request,queryset):
-        queryset.update(sem=8)
+        self.update_students(queryset, sem=8)
     def changeBatch(self,request,queryset):
-        queryset.update(batch=5)
+        self.update_students(queryset, batch=5)
+
+    def update_students(self, queryset, **changes):
+        ids = list(queryset.values_list("pk", flat=True))
+        queryset.update(**changes)
+        # update() sends no signals: drop cached logins (they embed the student row) and catalog responses
+        authentication.evict_users(ids)
+        cache.invalidate_catalog()
     
 @admin.register(models.HOD)
 class HODAdmin(admin.ModelAdmin):
     list_display = ['username','department']
     search_fields = ["username", "email", "department__name"]
+    list_select_related = ["department"]
     
 @admin.register(models.Course)
 class CourseAdmin(admin.ModelAdmin):
     list_filter = ['semester','department','is_optional']
     search_fields = ['name','code']
     list_display = ["name", "code", "program","department",'semester',"id","batchview"]
+    list_select_related = ["program__department", "department__hod"]
     
     actions =['Set_Optional',"Set_Compulsory",]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("batch")
+
     def batchview(self,obj):
         return ",".join([str(i) for i in obj.batch.all()])
     
     def Set_Optional(self,request,queryset):
         queryset.update(is_optional=True)
+        cache.invalidate_catalog()
     def Set_Compulsory(self,request,queryset):
         queryset.update(is_optional=False)
+        cache.invalidate_catalog()
 
 @admin.register(models.SemReport)
 class ReportAdmin(admin.ModelAdmin):
     list_display = [
         'student',
         "semester",
+        "course_count",
+        "total_credits",
     ]
+    list_select_related = ["student"]
+
+    def get_queryset(self, request):
+        # SemReport.__str__ lists the enrolled course codes
+        return super().get_queryset(request).prefetch_related("enrolled_courses__course")
     
 @admin.register(models.CourseStatus)
 class CourseItemAdmin(admin.ModelAdmin):
@@ -96,6 +120,21 @@ class CourseItemAdmin(admin.ModelAdmin):
         "is_finished",
         "finished_on"
     ]
+    list_select_related = ["course__program__department"]
+
+@admin.register(models.AuthToken)
+class AuthTokenAdmin(admin.ModelAdmin):
+    list_display = ["user", "created", "expires"]
+    search_fields = ["user__username"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+
+@admin.register(models.ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "kind", "status", "owner", "processed_rows", "total_rows", "created_on", "finished_on"]
+    list_filter = ["kind", "status"]
+    list_select_related = ["owner"]
+    readonly_fields = ["result"]
 
 
 
@@ -0,0 +1,225 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from . import models
+
+HOD = "HOD"
+STUDENT = "Student"
+ADMIN = "Admin"
+
+# Joined whenever a user is loaded, so ``user.hod`` / ``user.student`` and the
+# objects views read next to them are answered from memory
+ROLE_RELATED = ["hod__department", "student__department", "student__program", "student__batch"]
+
+
+def _role_from_cache(user):
+    if hasattr(user, "hod"):
+        return HOD
+    if hasattr(user, "student"):
+        return STUDENT
+    return ADMIN
+
+
+def get_role(user):
+    """Return HOD, Student or Admin for ``user`` (None when anonymous).
+
+    The role is cached on the user. Users loaded by RoleTokenAuthentication
+    already carry their HOD/Student rows; any other user costs one joined
+    query, after which ``user.hod`` / ``user.student`` are cached as well.
+    """
+    if not user.is_authenticated:
+        return None
+    if not hasattr(user, "role"):
+        if not all(User._meta.get_field(name).is_cached(user) for name in ("hod", "student")):
+            loaded = User.objects.select_related(*ROLE_RELATED).get(pk=user.pk)
+            for name in ("hod", "student"):
+                relation = User._meta.get_field(name)
+                relation.set_cached_value(user, relation.get_cached_value(loaded))
+        user.role = _role_from_cache(user)
+    return user.role
+
+
+def fresh_student(user):
+    """Re-read the Student row of ``user`` and cache it as ``user.student``.
+
+    Users served from the token cache carry the row as it was when the token
+    was cached, up to CBCS_TOKEN_CACHE_TTL ago. Views that act on the
+    student's semester, program or batch call this first; it costs one
+    joined query.
+    """
+    student = models.Student.objects.select_related("department", "program", "batch").get(pk=user.pk)
+    User._meta.get_field("student").set_cached_value(user, student)
+    return student
+
+
+def is_hod(user):
+    return get_role(user) == HOD
+
+
+def is_student(user):
+    return get_role(user) == STUDENT
+
+
+def is_admin(user):
+    return get_role(user) == ADMIN
+
+
+def login(username, password):
+    """Check credentials and issue a fresh token; returns ``(user, token)`` or None.
+
+    User, HOD/Student row and current token come from one joined query, and
+    the token is rotated with one write. Passwords hashed with an outdated
+    hasher or cost are rehashed by ``check_password``.
+    """
+    user = User.objects.select_related(*ROLE_RELATED, "cbcs_token").filter(username=username).first()
+    if user is None:
+        # Hash anyway so unknown usernames take as long as wrong passwords
+        User().set_password(password)
+        return None
+    if not (user.check_password(password) and user.is_active):
+        return None
+
+    user.role = _role_from_cache(user)
+    current = getattr(user, "cbcs_token", None)
+    token = models.AuthToken.objects.rotate(user, current)
+    if current is not None:
+        token_cache.evict(current.key)
+    return user, token
+
+
+class TokenCache:
+    """Bounded LRU of token key -> (user, token) whose entries expire after ``ttl`` seconds.
+
+    When ``shared_alias`` names a Django cache, entries live there instead
+    and every lookup goes to it, so an eviction in one process (token
+    revoked, rotated or user changed) takes effect in all of them. Without
+    one, each process only sees its own evictions and other processes keep
+    serving their entry for up to ``ttl`` seconds.
+    """
+
+    def __init__(self, maxsize, ttl, shared_alias=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def shared_key(self, key):
+        return f"auth:token:{key}"
+
+    def get(self, key):
+        if self.shared is not None:
+            return self.shared.get(self.shared_key(key))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                credentials, expires = entry
+                if expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return credentials
+                del self.entries[key]
+        return None
+
+    def set(self, key, credentials, ttl=None):
+        """Cache ``credentials``; ``ttl`` can only shorten the configured lifetime."""
+        ttl = self.ttl if ttl is None else min(self.ttl, ttl)
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), credentials, ttl)
+        else:
+            self.store(key, credentials, ttl)
+
+    def store(self, key, credentials, ttl=None):
+        with self.lock:
+            self.entries[key] = (credentials, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def evict(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self.shared_key(key) for key in keys])
+
+    def evict_users(self, user_ids, keys=()):
+        """Drop every entry of ``user_ids``; ``keys`` are their tokens known to the database."""
+        user_ids = set(user_ids)
+        with self.lock:
+            local = [key for key, ((user, _), _) in self.entries.items() if user.pk in user_ids]
+        self.evict(*set(local) | set(keys))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(
+    settings.CBCS_TOKEN_CACHE_SIZE,
+    settings.CBCS_TOKEN_CACHE_TTL,
+    settings.CBCS_TOKEN_SHARED_CACHE,
+)
+
+
+def evict_users(user_ids):
+    """Drop the cached credentials of ``user_ids`` after their rows changed.
+
+    Entries held by other processes are only reached through the shared
+    cache; without one they live on for up to CBCS_TOKEN_CACHE_TTL seconds.
+    """
+    user_ids = list(user_ids)
+    keys = []
+    if token_cache.shared is not None:
+        keys = models.AuthToken.objects.filter(user_id__in=user_ids).values_list("key", flat=True)
+    token_cache.evict_users(user_ids, keys)
+
+
+class RoleTokenAuthentication(TokenAuthentication):
+    """Expiring-token authentication that loads token, user and role in one query.
+
+    Results are kept in ``token_cache`` (never beyond the token's expiry), so
+    repeat requests with the same token do not touch the database. Every
+    request gets its own copy of the cached user.
+    """
+
+    model = models.AuthToken
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = self.load_credentials(key)
+            token_cache.set(key, credentials, (credentials[1].expires - timezone.now()).total_seconds())
+        elif credentials[1].is_expired:
+            token_cache.evict(key)
+            raise exceptions.AuthenticationFailed(_("Token has expired."))
+        return copy.deepcopy(credentials)
+
+    def load_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related("user", *(f"user__{name}" for name in ROLE_RELATED)).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        if token.is_expired:
+            raise exceptions.AuthenticationFailed(_("Token has expired."))
+
+        token.user.role = _role_from_cache(token.user)
+        return (token.user, token)
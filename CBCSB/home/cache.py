@@ -0,0 +1,76 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = "catalog:version"
+HITS_KEY = "catalog:hits"
+MISSES_KEY = "catalog:misses"
+
+
+def get_cache():
+    return caches[settings.CBCS_CATALOG_CACHE]
+
+
+def _incr(cache, key, initial=1):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The key was never set (or was evicted); add() keeps a racing writer's value
+        if not cache.add(key, initial, None):
+            cache.incr(key)
+
+
+def _new_version():
+    # A lost version key must not restart at a number already used, or entries
+    # written under that old version would be served again
+    return time.time_ns()
+
+
+def catalog_version(cache=None):
+    cache = cache or get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        seed = _new_version()
+        cache.add(VERSION_KEY, seed, None)
+        version = cache.get(VERSION_KEY, seed)
+    return version
+
+
+def invalidate_catalog():
+    """Drop every cached catalog response by moving to a new key version."""
+    _incr(get_cache(), VERSION_KEY, _new_version())
+
+
+def cached_response(name, parts, build):
+    """Return the cached response data for ``name``/``parts``, building it on a miss.
+
+    ``parts`` scope the entry (department, program, semester, ...); ``build``
+    is called without arguments and must return picklable data.
+    """
+    cache = get_cache()
+    key = ":".join(["catalog", str(catalog_version(cache)), name, *map(str, parts)])
+    data = cache.get(key)
+    if data is None:
+        _incr(cache, MISSES_KEY)
+        data = build()
+        cache.set(key, data, settings.CBCS_CATALOG_CACHE_TIMEOUT)
+    else:
+        _incr(cache, HITS_KEY)
+    return data
+
+
+def stats():
+    cache = get_cache()
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    return {
+        "version": catalog_version(cache),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import connections
+
+
+def connection_stats(alias="default"):
+    """Describe how this process manages connections to ``alias``.
+
+    ``pool`` holds psycopg's utilisation counters (pool_min, pool_max,
+    pool_size, pool_available, requests_waiting, ...) when pooling is enabled; pools are per process, so
+    the numbers cover only the worker answering the call.
+    """
+    connection = connections[alias]
+    pool = getattr(connection, "pool", None)
+    stats = {
+        "vendor": connection.vendor,
+        "conn_max_age": settings.DATABASES[alias].get("CONN_MAX_AGE", 0),
+        "health_checks": settings.DATABASES[alias].get("CONN_HEALTH_CHECKS", False),
+        "pool": None,
+    }
+    if pool is not None:
+        stats["pool"] = pool.get_stats()
+    return stats
@@ -0,0 +1,157 @@
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from . import models
+from .rules import EnrollmentRules
+
+TOTALS = ["total_credits", "course_count", "elective_count"]
+APPROVED = "Cannot modify an approved report."
+
+
+def _as_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _totals(courses):
+    """Totals of ``(credit, is_optional)`` pairs."""
+    courses = list(courses)
+    return {
+        "total_credits": sum(credit for credit, _ in courses),
+        "course_count": len(courses),
+        "elective_count": sum(optional for _, optional in courses),
+    }
+
+
+def _lock(report):
+    """Lock ``report``'s row for the transaction; approved reports cannot change."""
+    locked = models.SemReport.objects.select_for_update().filter(pk=report.pk).first()
+    if locked is None or locked.is_approved:
+        raise PermissionDenied(APPROVED)
+    return locked
+
+
+def _apply_totals(report, locked, delta, **fields):
+    """Add ``delta`` to the report's totals with one UPDATE and mirror it on ``report``."""
+    models.SemReport.objects.filter(pk=report.pk).update(
+        **{name: F(name) + value for name, value in delta.items()}, **fields
+    )
+    for name, value in delta.items():
+        setattr(report, name, getattr(locked, name) + value)
+    for name, value in fields.items():
+        setattr(report, name, value)
+
+
+def enroll_courses(report, course_ids, student=None):
+    """Enroll ``report`` in every course of ``course_ids`` in one transaction.
+
+    Each course must be open to the student's program, batch and the
+    report's semester, and the report must stay within the credit limit
+    (see rules.EnrollmentRules). The number of queries does not depend on
+    how many courses are requested. Returns ``(messages, errors)`` with one
+    entry per requested ID, in order. Raises PermissionDenied if the report
+    is approved.
+    """
+    messages, errors = [], []
+    rules = EnrollmentRules(student or report.student, report.semester)
+    pks = {pk for pk in map(_as_pk, course_ids) if pk is not None}
+    with transaction.atomic():
+        # Lock the report so concurrent submissions cannot both pass the overlap and credit checks,
+        # nor slip in while the HOD approves it
+        locked = _lock(report)
+        credits = locked.total_credits
+        enrolled = set(report.enrolled_courses.filter(course_id__in=pks).values_list("course_id", flat=True))
+        # Only IDs outside the eligible set need a lookup, to tell unknown courses from closed ones
+        ineligible = {pk for pk in pks if not rules.is_eligible(pk)}
+        closed = dict(models.Course.objects.filter(pk__in=ineligible).values_list("pk", "name")) if ineligible else {}
+        pending = []
+        for course_id in course_ids:
+            pk = _as_pk(course_id)
+            if rules.is_eligible(pk):
+                error = rules.reject(pk, credits, enrolled)
+                if error:
+                    errors.append(error)
+                    continue
+                enrolled.add(pk)
+                credits += rules.credit(pk)
+                pending.append(models.CourseStatus(course_id=pk, status="Enrolled", semester=report.semester))
+                messages.append(f"{rules.courses[pk][0]} enrolled successfully.")
+            elif pk in closed:
+                errors.append(f"{closed[pk]} is not offered for your program, batch and semester.")
+            else:
+                errors.append(f"Course with ID {course_id} does not exist.")
+
+        if pending:
+            report.enrolled_courses.add(*models.CourseStatus.objects.bulk_create(pending))
+            added = _totals(rules.courses[status.course_id][1:] for status in pending)
+            _apply_totals(report, locked, added, reason_for_rejection="")
+    return messages, errors
+
+
+def unenroll_courses(report, course_ids):
+    """Drop every course of ``course_ids`` from ``report`` in one transaction.
+
+    Matching CourseStatus rows are resolved in one query and removed with a
+    single DELETE, and the report's totals are recounted from the courses
+    that remain. Returns ``(messages, errors, missing)`` where ``missing``
+    holds the requested IDs that were not enrolled (or do not exist).
+    Raises PermissionDenied if the report is approved.
+    """
+    messages, errors, missing = [], [], []
+    pks = {pk for pk in map(_as_pk, course_ids) if pk is not None}
+    with transaction.atomic():
+        locked = _lock(report)
+        courses = models.Course.objects.in_bulk(pks)
+        statuses = dict(report.enrolled_courses.filter(course_id__in=courses).values_list("pk", "course_id"))
+        enrolled = set(statuses.values())
+        for course_id in course_ids:
+            course = courses.get(_as_pk(course_id))
+            if course is None:
+                errors.append(f"Course with ID {course_id} does not exist.")
+                missing.append(course_id)
+            elif course.pk in enrolled:
+                enrolled.discard(course.pk)
+                messages.append(f"{course.name} unenrolled successfully.")
+            else:
+                errors.append(f"{course.name} is not enrolled.")
+                missing.append(course_id)
+
+        if statuses:
+            models.CourseStatus.objects.filter(pk__in=statuses).delete()
+            # Recount rather than subtract: a course's credit may have changed since it was enrolled
+            recount_totals([locked])
+            for name in TOTALS:
+                setattr(report, name, getattr(locked, name))
+    return messages, errors, missing
+
+
+def recount_totals(reports):
+    """Recompute the enrollment totals of ``reports`` from their CourseStatus rows.
+
+    One aggregate query over the report/course through table, then one bulk
+    UPDATE. Returns the number of reports whose stored totals changed.
+    """
+    reports = list(reports)
+    through = models.SemReport.enrolled_courses.through
+    counted = {
+        row.pop("semreport_id"): row
+        for row in through.objects.filter(semreport_id__in=[report.pk for report in reports])
+        .values("semreport_id")
+        .annotate(
+            total_credits=Sum("coursestatus__course__courseCredit"),
+            course_count=Count("pk"),
+            elective_count=Count("pk", filter=Q(coursestatus__course__is_optional=True)),
+        )
+    }
+    changed = []
+    for report in reports:
+        totals = counted.get(report.pk, dict.fromkeys(TOTALS, 0))
+        if any(getattr(report, name) != totals[name] for name in TOTALS):
+            for name in TOTALS:
+                setattr(report, name, totals[name])
+            changed.append(report)
+    models.SemReport.objects.bulk_update(changed, TOTALS)
+    return len(changed)
@@ -0,0 +1,92 @@
+import csv
+import tempfile
+
+import openpyxl
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+
+from . import models
+
+# The first columns are the ones StudentRegisterBulk reads, so an export can be re-imported
+STUDENT_COLUMNS = ["Username", "email", "first_name", "last_name", "Semester (number)", "Batch Start Year", "Batch End Year", "DOJ"]
+REPORT_COLUMNS = ["Report Semester", "Approved", "Reason For Rejection", "Course Code", "Course Name", "Course Credit", "Elective", "Course Status"]
+HEADER = STUDENT_COLUMNS + REPORT_COLUMNS
+
+FIELDS = [
+    "student__username",
+    "student__email",
+    "student__first_name",
+    "student__last_name",
+    "student__sem",
+    "student__batch__start_year__year",
+    "student__batch__end_year__year",
+    "student__joined_date",
+    "semester",
+    "is_approved",
+    "reason_for_rejection",
+    "enrolled_courses__course__code",
+    "enrolled_courses__course__name",
+    "enrolled_courses__course__courseCredit",
+    "enrolled_courses__course__is_optional",
+    "enrolled_courses__status",
+]
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def report_rows(department, batch=None, semester=None):
+    """Yield one tuple per enrolled course of the department's semester reports.
+
+    Reports without courses still get one row with blank course columns.
+    Rows come from a single values-only query read in chunks, so no model
+    instances are built.
+    """
+    reports = models.SemReport.objects.filter(student__department=department)
+    if batch:
+        reports = reports.filter(student__batch=batch)
+    if semester:
+        reports = reports.filter(semester=semester)
+    rows = reports.order_by("student__username", "semester", "enrolled_courses__course__code").values_list(*FIELDS)
+    yield from rows.iterator(chunk_size=settings.CBCS_STREAM_CHUNK_SIZE)
+
+
+class Echo:
+    """File-like object whose write() hands back the line, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(rows, filename):
+    writer = csv.writer(Echo())
+    lines = (writer.writerow(row) for row in _with_header(rows))
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES["csv"])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(rows, filename):
+    """Write ``rows`` with a write-only workbook to a temporary file and send it."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Reports")
+    for row in _with_header(rows):
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=f"{filename}.xlsx", content_type=CONTENT_TYPES["xlsx"])
+
+
+def _with_header(rows):
+    yield HEADER
+    yield from rows
+
+
+def export_reports(department, fmt, batch=None, semester=None):
+    """Response with the department's reports as an .xlsx or .csv attachment (``fmt``)."""
+    filename = "_".join(str(part) for part in ("reports", department.name, batch and f"batch{batch}", semester and f"sem{semester}") if part)
+    rows = report_rows(department, batch=batch, semester=semester)
+    return xlsx_response(rows, filename) if fmt == "xlsx" else csv_response(rows, filename)
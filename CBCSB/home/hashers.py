@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+
+# Each hasher keeps its parent's algorithm name, so existing hashes still
+# verify and are rehashed on the next login whenever the cost changes.
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = settings.CBCS_PBKDF2_ITERATIONS or PBKDF2PasswordHasher.iterations
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = settings.CBCS_ARGON2_TIME_COST or Argon2PasswordHasher.time_cost
+    memory_cost = settings.CBCS_ARGON2_MEMORY_COST or Argon2PasswordHasher.memory_cost
+    parallelism = settings.CBCS_ARGON2_PARALLELISM or Argon2PasswordHasher.parallelism
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    rounds = settings.CBCS_BCRYPT_ROUNDS or BCryptSHA256PasswordHasher.rounds
@@ -0,0 +1,321 @@
+import csv
+import io
+import math
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import openpyxl
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError, transaction
+
+from . import cache, models, serializers
+
+SEMESTERS = {value for value, _ in models.year_opt}
+
+
+def read_rows(uploaded_file, sheet_name=None):
+    """Yield the data rows of an .xlsx, .xls or .csv upload as dicts keyed by header.
+
+    .xlsx and .csv files are streamed row by row; legacy .xls files can only be
+    loaded whole through pandas.
+    """
+    name = uploaded_file.name.lower()
+    if name.endswith(".csv"):
+        text = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+        try:
+            yield from csv.DictReader(text)
+        finally:
+            # Leave the upload open for the caller
+            text.detach()
+    elif name.endswith(".xlsx"):
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            sheet = workbook[sheet_name] if sheet_name else workbook.active
+            rows = sheet.iter_rows(values_only=True)
+            header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+            for values in rows:
+                if any(value is not None for value in values):
+                    yield dict(zip(header, values))
+        finally:
+            workbook.close()
+    else:
+        import pandas as pd
+
+        yield from pd.read_excel(uploaded_file, sheet_name=sheet_name or 0).to_dict("records")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def cell_text(value):
+    """Normalise a spreadsheet cell to text: blanks become "" and 3.0 becomes "3"."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def cell_int(value):
+    try:
+        return int(float(cell_text(value)))
+    except ValueError:
+        return None
+
+
+class PasswordHashPool:
+    """Hash passwords in batches, across a process pool when ``workers`` > 1.
+
+    Used as a context manager so the worker processes are started once per
+    import rather than once per chunk.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = settings.CBCS_HASH_WORKERS if workers is None else workers
+        self.pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def hash(self, passwords):
+        if self.pool is None or len(passwords) < 2:
+            return [make_password(password) for password in passwords]
+        chunksize = max(len(passwords) // (self.workers * 4), 1)
+        return list(self.pool.map(make_password, passwords, chunksize=chunksize))
+
+
+class StudentImporter:
+    """Import students from spreadsheet rows in chunks of bulk INSERTs.
+
+    Batches are resolved once up front, each chunk is validated with a single
+    username lookup, its passwords are hashed on a PasswordHashPool and it is
+    written inside its own savepoint, so a failing chunk does not undo the
+    ones before it. Repeated rows of a student already taken from the same
+    file (as in report exports) are skipped; conflicting ones are errors.
+    """
+
+    def __init__(self, department, program, chunk_size=None, hash_workers=None):
+        self.department = department
+        self.program = program
+        self.chunk_size = chunk_size or settings.CBCS_IMPORT_CHUNK_SIZE
+        self.hash_workers = hash_workers
+        self.hasher = None
+        self.batches = {(b.start_year.year, b.end_year.year): b.pk for b in models.Batch.objects.all()}
+        # username -> student columns of its first row in this file
+        self.seen = {}
+
+    def run(self, rows, progress=None):
+        """Import ``rows``; ``progress`` is called with the number of rows done after each chunk."""
+        message = {"success": [], "error": []}
+        done = 0
+        with PasswordHashPool(self.hash_workers) as self.hasher:
+            for chunk in chunked(rows, self.chunk_size):
+                self.import_chunk(chunk, message)
+                done += len(chunk)
+                if progress:
+                    progress(done)
+        return message
+
+    def import_chunk(self, rows, message):
+        parsed = []
+        for itm in rows:
+            username = cell_text(itm.get("Username"))
+            try:
+                parsed.append(self.build(itm, username))
+            except ValidationError as e:
+                message["error"].append({"id": username, "error": " ".join(e.messages)})
+
+        existing = set(
+            User.objects.filter(username__in=[s.username for s in parsed]).values_list("username", flat=True)
+        )
+        students = []
+        for student in parsed:
+            if self.seen.get(student.username) == self.identity(student):
+                # Report exports repeat a student once per course; the first row created it
+                continue
+            if student.username in existing or student.username in self.seen:
+                message["error"].append({"id": student.username, "error": "A user with that username already exists."})
+            else:
+                self.seen[student.username] = self.identity(student)
+                students.append(student)
+        if not students:
+            return
+
+        self.hash_passwords(students)
+        try:
+            with transaction.atomic():
+                models.Student.objects.bulk_create_students(students)
+        except DatabaseError as e:
+            message["error"].extend({"id": s.username, "error": str(e)} for s in students)
+        else:
+            # Bulk inserts send no post_save signals
+            cache.invalidate_catalog()
+            message["success"].extend({"id": s.username, "message": "Student Created"} for s in students)
+
+    def build(self, itm, username):
+        if not username:
+            raise ValidationError("Username is required.")
+        start, end = cell_int(itm.get("Batch Start Year")), cell_int(itm.get("Batch End Year"))
+        batch = self.batches.get((start, end))
+        if batch is None:
+            raise ValidationError(f"Batch {start} - {end} does not exist.")
+        sem = cell_text(itm.get("Semester (number)"))
+        if sem not in SEMESTERS:
+            raise ValidationError(f'"{sem}" is not a valid semester.')
+
+        student = models.Student(
+            username=username,
+            email=cell_text(itm.get("email")),
+            first_name=cell_text(itm.get("first_name")),
+            last_name=cell_text(itm.get("last_name")),
+            department=self.department,
+            program=self.program,
+            batch_id=batch,
+            sem=sem,
+        )
+        # The initial password is the username, as with single registrations
+        student.password = username
+        student.clean_fields(exclude=["password", "department", "program", "batch", "reports"])
+        return student
+
+    def identity(self, student):
+        return (student.email, student.first_name, student.last_name, student.batch_id, student.sem)
+
+    def hash_passwords(self, students):
+        hashed = self.hasher.hash([student.password for student in students])
+        for student, password in zip(students, hashed):
+            student.password = password
+
+
+class CourseImporter:
+    """Import courses of one department from CourseUploadBluk spreadsheets."""
+
+    def __init__(self, department):
+        self.department = department
+
+    def run(self, rows, progress=None):
+        message = {"success": [], "error": []}
+        done = 0
+        for itm in rows:
+            data = {
+                "name": itm['Course Name'],
+                "code": itm["Course Code"],
+                "is_optional": itm["Optional"],
+                "courseCredit": itm["Credit"],
+                "semester": itm["Semester"],
+                "program": itm["Program"]
+            }
+            try:
+                courseSerial = serializers.CourseSerial(data=data)
+                if courseSerial.is_valid(raise_exception=True):
+                    courseSerial.save(department=self.department)
+                    message['success'].append({"id": itm["Course Code"], "message": "Course Created"})
+            except IntegrityError as e:  # Catching IntegrityError for unique constraints
+                message['error'].append({"id": itm["Course Code"], "error": str(e)})
+            except Exception as e:
+                message['error'].append({"id": itm["Course Code"], "error": str(e)})
+            done += 1
+            if progress and done % settings.CBCS_IMPORT_CHUNK_SIZE == 0:
+                progress(done)
+        if progress and done % settings.CBCS_IMPORT_CHUNK_SIZE:
+            progress(done)
+        return message
+
+
+class CurriculumImporter:
+    """Import a department's curriculum sheet (the HodDashBoard BulkCourseUpload).
+
+    Batches and programs are loaded into dictionaries once; each chunk of
+    rows costs one lookup of existing course codes, one bulk INSERT of
+    courses and one bulk INSERT into the course/batch through table.
+    """
+
+    sheet_name = "Sheet1"
+
+    def __init__(self, department, chunk_size=None):
+        self.department = department
+        self.chunk_size = chunk_size or settings.CBCS_IMPORT_CHUNK_SIZE
+        self.batches = {(b.start_year.year, b.end_year.year): b.pk for b in models.Batch.objects.all()}
+        self.programs = models.Program.objects.in_bulk()
+        self.seen = set()
+
+    def run(self, rows, progress=None):
+        message = {"success": [], "error": []}
+        done = 0
+        for chunk in chunked(rows, self.chunk_size):
+            self.import_chunk(chunk, message)
+            done += len(chunk)
+            if progress:
+                progress(done)
+        return message
+
+    def import_chunk(self, rows, message):
+        parsed = []
+        for itm in rows:
+            name = cell_text(itm.get("Subject Name"))
+            try:
+                parsed.append(self.build(itm))
+            except ValidationError as e:
+                message['error'].append(f'{name}: {" ".join(e.messages)}')
+
+        existing = set(models.Course.objects.filter(code__in=[c.code for c, _ in parsed]).values_list("code", flat=True))
+        courses = []
+        for course, batch in parsed:
+            if course.code in existing or course.code in self.seen:
+                message['error'].append(f"{course.name} already exists.")
+            else:
+                self.seen.add(course.code)
+                courses.append((course, batch))
+        if not courses:
+            return
+
+        try:
+            with transaction.atomic():
+                created = models.Course.objects.bulk_create([course for course, _ in courses])
+                models.Course.batch.through.objects.bulk_create(
+                    models.Course.batch.through(course_id=course.pk, batch_id=batch)
+                    for course, (_, batch) in zip(created, courses)
+                )
+        except IntegrityError:
+            message['error'].extend(f"{course.name} already exists." for course, _ in courses)
+        except DatabaseError as e:
+            message['error'].extend(f"{course.name}: {e}" for course, _ in courses)
+        else:
+            cache.invalidate_catalog()
+            message['success'].extend(f"{course.name} created successfully." for course, _ in courses)
+
+    def build(self, itm):
+        start, end = cell_int(itm.get("Batch Start Year")), cell_int(itm.get("Batch End Year"))
+        batch = self.batches.get((start, end))
+        if batch is None:
+            raise ValidationError(f"Batch {start} - {end} does not exist.")
+        program = self.programs.get(cell_int(itm.get("Program")))
+        if program is None:
+            raise ValidationError(f'Program "{cell_text(itm.get("Program"))}" does not exist.')
+        credit = cell_int(itm.get("Course Credit"))
+        if credit is None:
+            raise ValidationError("A valid integer is required for the course credit.")
+
+        course = models.Course(
+            name=cell_text(itm.get("Subject Name")),
+            code=cell_text(itm.get("Subject Code")),
+            courseCredit=credit,
+            semester=cell_text(itm.get("Semester (number)")),
+            department=self.department,
+            program=program,
+        )
+        course.clean_fields(exclude=["department", "program"])
+        return course, batch
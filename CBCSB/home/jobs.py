@@ -0,0 +1,124 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import importers, models
+
+logger = logging.getLogger(__name__)
+
+
+def wants_background(request):
+    """Uploads opt into the job queue with ``async=true``."""
+    return str(request.data.get("async", "")).lower() in ("1", "true", "yes")
+
+
+def enqueue(kind, uploaded_file, owner, department, **params):
+    """Store ``uploaded_file`` and queue it; returns the ImportJob without processing it."""
+    job = models.ImportJob(kind=kind, owner=owner, department=department, params=params)
+    job.file.save(uploaded_file.name, uploaded_file, save=False)
+    job.save()
+    return job
+
+
+def build_importer(job):
+    if job.kind == models.ImportJob.STUDENTS:
+        program = models.Program.objects.get(pk=job.params["program"])
+        return importers.StudentImporter(job.department, program)
+    if job.kind == models.ImportJob.COURSES:
+        return importers.CourseImporter(job.department)
+    return importers.CurriculumImporter(job.department)
+
+
+def claim_next():
+    """Atomically move the oldest queued job to running, or return None.
+
+    The conditional UPDATE lets several workers poll the same table without
+    picking up the same job.
+    """
+    for pk in models.ImportJob.objects.filter(status=models.ImportJob.QUEUED).order_by("pk").values_list("pk", flat=True)[:5]:
+        now = timezone.now()
+        claimed = models.ImportJob.objects.filter(pk=pk, status=models.ImportJob.QUEUED).update(
+            status=models.ImportJob.RUNNING, started_on=now, heartbeat_on=now
+        )
+        if claimed:
+            return models.ImportJob.objects.select_related("department").get(pk=pk)
+    return None
+
+
+def progress_recorder(job):
+    """Callback for the importers' ``progress`` that stores the rows written so far.
+
+    Each call also bumps the job's heartbeat, so reclaim_stale leaves it alone.
+    """
+    def record(done):
+        models.ImportJob.objects.filter(pk=job.pk).update(processed_rows=done, heartbeat_on=timezone.now())
+    return record
+
+
+def reclaim_stale(now=None):
+    """Fail jobs left running by a worker that died; returns how many.
+
+    A running job counts as abandoned once its worker has not reported
+    progress for CBCS_JOB_STALE_AFTER seconds, however long ago it started.
+    Chunks written before the worker stopped stay imported, so the job is
+    failed rather than run again.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.CBCS_JOB_STALE_AFTER)
+    reclaimed = 0
+    for job in models.ImportJob.objects.filter(status=models.ImportJob.RUNNING, heartbeat_on__lt=cutoff):
+        result = {"error": f"The import stopped after {job.processed_rows} of {job.total_rows} rows and was abandoned."}
+        if models.ImportJob.objects.filter(pk=job.pk, status=models.ImportJob.RUNNING).update(
+            status=models.ImportJob.FAILED, result=result, finished_on=now
+        ):
+            logger.warning("Import job %s abandoned by its worker", job.pk)
+            job.file.delete(save=False)
+            models.ImportJob.objects.filter(pk=job.pk).update(file="")
+            reclaimed += 1
+    return reclaimed
+
+
+def run(job):
+    try:
+        importer = build_importer(job)
+        sheet_name = getattr(importer, "sheet_name", None)
+        with job.file.open("rb") as upload:
+            job.total_rows = sum(1 for _ in importers.read_rows(upload, sheet_name=sheet_name))
+            models.ImportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows, heartbeat_on=timezone.now())
+            upload.seek(0)
+            message = importer.run(importers.read_rows(upload, sheet_name=sheet_name), progress=progress_recorder(job))
+        job.result = {"message": "File processed successfully.", "details": message}
+        job.status = models.ImportJob.DONE
+    except Exception as e:
+        logger.exception("Import job %s failed", job.pk)
+        job.result = {"error": str(e)}
+        job.status = models.ImportJob.FAILED
+    job.finished_on = timezone.now()
+    job.file.delete(save=False)
+    # Only a job still marked running is ours to finish; reclaim_stale may have failed it meanwhile
+    finished = models.ImportJob.objects.filter(pk=job.pk, status=models.ImportJob.RUNNING).update(
+        status=job.status, result=job.result, file="", finished_on=job.finished_on
+    )
+    if not finished:
+        logger.warning("Import job %s was failed as abandoned before it finished", job.pk)
+        job.refresh_from_db()
+    return job
+
+
+def work(once=False, interval=None):
+    """Process queued jobs until interrupted (or until the queue is empty with ``once``)."""
+    interval = settings.CBCS_JOB_POLL_INTERVAL if interval is None else interval
+    while True:
+        close_old_connections()
+        reclaim_stale()
+        job = claim_next()
+        if job is not None:
+            run(job)
+        elif once:
+            return
+        else:
+            time.sleep(interval)
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Min, OuterRef, Subquery
+
+from home.enrollment import TOTALS, recount_totals
+from home.importers import chunked
+from home.models import SemReport, Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge duplicate semester reports, fill in report departments and recompute "
+        "the credit and course totals stored on semester reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Reports recounted per query.")
+        parser.add_argument(
+            "--merge-only",
+            action="store_true",
+            help="Only merge duplicate reports; safe on a schema without the report totals and department yet.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Merged {self.merge_duplicates()} duplicate reports.")
+        if options["merge_only"]:
+            return
+        filled = SemReport.objects.filter(department__isnull=True).update(
+            department_id=Subquery(Student.objects.filter(pk=OuterRef("student_id")).values("department_id")[:1])
+        )
+        self.stdout.write(f"Filled in the department of {filled} reports.")
+
+        reports = SemReport.objects.only("pk", *TOTALS).order_by("pk")
+        seen = changed = 0
+        for chunk in chunked(reports.iterator(chunk_size=options["batch_size"]), options["batch_size"]):
+            seen += len(chunk)
+            changed += recount_totals(chunk)
+        self.stdout.write(f"Checked {seen} reports, updated {changed}.")
+
+    def merge_duplicates(self):
+        """Fold every extra report of a (student, semester) into the oldest one.
+
+        Needed once before the unique (student, semester) constraint can be
+        created on a database that already holds duplicates, so it only
+        touches columns that predate that schema change: primary keys, the
+        grouping columns and the two many-to-many tables. Run it with
+        ``--merge-only`` before migrating.
+        """
+        duplicates = (
+            SemReport.objects.order_by()
+            .values("student_id", "semester")
+            .annotate(reports=Count("pk"), keep=Min("pk"))
+            .filter(reports__gt=1)
+        )
+        table = connection.ops.quote_name(SemReport._meta.db_table)
+        column = connection.ops.quote_name(SemReport._meta.pk.column)
+        merged = 0
+        for duplicate in duplicates:
+            with transaction.atomic():
+                extra = list(
+                    SemReport.objects.filter(student_id=duplicate["student_id"], semester=duplicate["semester"])
+                    .exclude(pk=duplicate["keep"])
+                    .values_list("pk", flat=True)
+                )
+                SemReport.enrolled_courses.through.objects.filter(semreport_id__in=extra).update(semreport_id=duplicate["keep"])
+                Student.reports.through.objects.filter(semreport_id__in=extra).delete()
+                # Not QuerySet.delete(): collecting the rows would select every current model column
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(extra))})", extra)
+                merged += len(extra)
+        return merged
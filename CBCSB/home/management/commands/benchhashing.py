@@ -0,0 +1,41 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from home.importers import PasswordHashPool
+
+
+class Command(BaseCommand):
+    help = "Measure bulk-import password hashing throughput (rows/second) for several worker counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200, help="Passwords hashed per run.")
+        parser.add_argument(
+            "--workers", type=int, nargs="+",
+            help="Worker counts to measure (default: 1, 2, 4, ... up to the CPU count).",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"] or self.default_workers()
+        passwords = [f"23CS{n:05d}" for n in range(options["rows"])]
+        baseline = None
+        for count in workers:
+            with PasswordHashPool(count) as hasher:
+                # Warm the pool up so process start-up is not measured
+                hasher.hash(passwords[:count * 2])
+                started = time.perf_counter()
+                hasher.hash(passwords)
+                elapsed = time.perf_counter() - started
+            rate = len(passwords) / elapsed
+            baseline = baseline or rate
+            self.stdout.write(f"workers={count:<3} {rate:10.1f} rows/s  x{rate / baseline:.2f}")
+
+    def default_workers(self):
+        cpus = os.cpu_count() or 1
+        counts = [1]
+        while counts[-1] * 2 <= cpus:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != cpus:
+            counts.append(cpus)
+        return counts
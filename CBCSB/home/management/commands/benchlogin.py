@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+
+from home.importers import PasswordHashPool
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure logins/second through the login endpoint on one core. Temporary users are "
+        "created inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="Distinct users logging in.")
+        parser.add_argument("--logins", type=int, default=100, help="Total logins to perform.")
+
+    def handle(self, *args, **options):
+        usernames = [f"bench-login-{n}" for n in range(options["users"])]
+        client = Client()
+        with transaction.atomic():
+            with PasswordHashPool() as hasher:
+                passwords = hasher.hash(usernames)
+            User.objects.bulk_create(User(username=u, password=p) for u, p in zip(usernames, passwords))
+
+            started = time.perf_counter()
+            for n in range(options["logins"]):
+                username = usernames[n % len(usernames)]
+                response = client.post("/login/", {"username": username, "password": username}, content_type="application/json")
+                if response.status_code != 200:
+                    self.stderr.write(f"Login failed for {username}: {response.content.decode()}")
+                    break
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{n + 1} logins in {elapsed:.2f}s: {(n + 1) / elapsed:.1f} logins/s per core")
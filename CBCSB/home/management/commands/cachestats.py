@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from home import cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the catalog response cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing them.")
+        parser.add_argument("--invalidate", action="store_true", help="Drop every cached catalog response.")
+
+    def handle(self, *args, **options):
+        stats = cache.stats()
+        self.stdout.write(
+            f"version={stats['version']} hits={stats['hits']} misses={stats['misses']} "
+            f"hit_ratio={stats['hit_ratio']:.2%}"
+        )
+        if options["reset"]:
+            cache.reset_stats()
+        if options["invalidate"]:
+            cache.invalidate_catalog()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from home.models import AuthToken
+
+
+class Command(BaseCommand):
+    # Expired tokens are already refused on every request, cached or not, so
+    # purging only reclaims space; see revoketokens for live tokens
+    help = "Delete expired login tokens in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Tokens deleted per statement.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        purged = 0
+        while True:
+            # Walks the expires index, so each batch is a short range scan
+            keys = list(AuthToken.objects.expired(now).order_by("expires").values_list("pk", flat=True)[:options["batch_size"]])
+            if not keys:
+                break
+            purged += AuthToken.objects.filter(pk__in=keys).revoke()
+        self.stdout.write(f"Purged {purged} expired tokens.")
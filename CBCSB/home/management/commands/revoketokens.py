@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from home.models import AuthToken
+
+
+class Command(BaseCommand):
+    help = "Revoke the login tokens of a department, a batch, or everyone."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--department", type=int, help="Department ID (its HOD and students).")
+        parser.add_argument("--batch", type=int, help="Batch ID (its students).")
+        parser.add_argument("--all", action="store_true", help="Revoke every token.")
+
+    def handle(self, *args, **options):
+        tokens = AuthToken.objects.all()
+        if options["department"]:
+            tokens = tokens.for_department(options["department"])
+        if options["batch"]:
+            tokens = tokens.for_batch(options["batch"])
+        if not (options["department"] or options["batch"] or options["all"]):
+            raise CommandError("Pass --department, --batch or --all.")
+        self.stdout.write(f"Revoked {tokens.revoke()} tokens.")
+        if not settings.CBCS_TOKEN_SHARED_CACHE:
+            self.stdout.write(
+                self.style.WARNING(
+                    "CBCS_TOKEN_SHARED_CACHE is not set: running web processes may keep accepting "
+                    f"the revoked tokens for up to {settings.CBCS_TOKEN_CACHE_TTL} seconds."
+                )
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from home import jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued spreadsheet imports (students, courses, curriculum)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument("--interval", type=float, help="Seconds to wait between polls of an empty queue.")
+
+    def handle(self, *args, **options):
+        jobs.work(once=options["once"], interval=options["interval"])
@@ -0,0 +1,204 @@
+import cProfile
+import heapq
+import hmac
+import json
+import logging
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` hook that counts and times every SQL statement.
+
+    Only the ``keep`` slowest statements are retained, so memory stays
+    bounded however many queries a request runs (unlike DEBUG's
+    ``connection.queries``). With ``trace`` every statement is also kept,
+    in order, in ``statements``.
+    """
+
+    def __init__(self, keep=5, trace=False):
+        self.keep = keep
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []
+        self.sequence = 0
+        self.statements = [] if trace else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(sql, time.perf_counter() - start, context["connection"].alias)
+
+    def add(self, sql, duration, alias):
+        self.count += 1
+        self.total += duration
+        self.sequence += 1
+        if self.statements is not None:
+            self.statements.append({"ms": round(duration * 1000, 2), "db": alias, "sql": sql})
+        entry = (duration, self.sequence, alias, sql)
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, entry)
+        elif self.keep:
+            heapq.heappushpop(self.slowest, entry)
+
+    @contextmanager
+    def record(self):
+        """Record the statements run on every database connection of this thread."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def slowest_statements(self):
+        return [
+            {"ms": round(duration * 1000, 2), "db": alias, "sql": sql}
+            for duration, _, alias, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+class QueryInstrumentationMiddleware:
+    """Report query count, database time and the slowest statements of each request.
+
+    Enabled with CBCS_QUERY_INSTRUMENTATION; when off, Django drops the
+    middleware at startup so it costs nothing. Results go to a
+    ``Server-Timing`` header and one JSON log line on the ``home.middleware``
+    logger, at WARNING level when the request crosses
+    CBCS_SLOW_REQUEST_MS or CBCS_SLOW_REQUEST_QUERIES. Queries run while a
+    streaming response is consumed happen after the view and are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not settings.CBCS_QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(settings.CBCS_SLOWEST_QUERIES)
+        start = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        db_ms, total_ms = recorder.total * 1000, elapsed * 1000
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={db_ms:.1f};desc="{recorder.count} queries"',
+                f"app;dur={total_ms - db_ms:.1f}",
+                f"total;dur={total_ms:.1f}",
+            ]
+        )
+        flags = []
+        if total_ms > settings.CBCS_SLOW_REQUEST_MS:
+            flags.append("slow")
+        if recorder.count > settings.CBCS_SLOW_REQUEST_QUERIES:
+            flags.append("queries")
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "ms": round(total_ms, 1),
+            "db_ms": round(db_ms, 1),
+            "queries": recorder.count,
+            "flags": flags,
+            "slowest": recorder.slowest_statements(),
+        }
+        logger.log(logging.WARNING if flags else logging.INFO, json.dumps(record))
+        return response
+
+
+class ProfilingMiddleware:
+    """Profile single requests on demand.
+
+    A request to one of CBCS_PROFILE_VIEWS that carries CBCS_PROFILE_TOKEN,
+    in the ``X-CBCS-Profile`` header or as ``?profile=``, runs its view
+    under pyinstrument when it is installed, or cProfile otherwise. The
+    profile and the full SQL trace are written to CBCS_PROFILE_DIR and the
+    file name is returned in the ``X-CBCS-Profile`` response header. At most
+    one request is profiled per CBCS_PROFILE_INTERVAL seconds across all
+    processes sharing the default cache. Without a token configured the
+    middleware is removed at startup.
+    """
+
+    header = "X-CBCS-Profile"
+
+    def __init__(self, get_response):
+        if not settings.CBCS_PROFILE_TOKEN:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = getattr(view_func, "view_class", view_func).__name__
+        if name not in settings.CBCS_PROFILE_VIEWS or not self.authorized(request):
+            return None
+        if not caches["default"].add("profile:last", 1, settings.CBCS_PROFILE_INTERVAL):
+            logger.info("Profiling of %s skipped: rate limited", request.path)
+            return None
+        return self.profile(request, name, view_func, view_args, view_kwargs)
+
+    def authorized(self, request):
+        token = request.headers.get(self.header) or request.GET.get("profile")
+        # compare_digest refuses str with non-ASCII characters; bytes always compare
+        return bool(token) and hmac.compare_digest(token.encode(), settings.CBCS_PROFILE_TOKEN.encode())
+
+    def traced_path(self, request):
+        # Never write the profiling token to disk
+        query = request.GET.copy()
+        query.pop("profile", None)
+        return f"{request.path}?{query.urlencode()}" if query else request.path
+
+    def profile(self, request, name, view_func, view_args, view_kwargs):
+        recorder = QueryRecorder(settings.CBCS_SLOWEST_QUERIES, trace=True)
+        profiler = SamplingProfiler() if SamplingProfiler else cProfile.Profile()
+        start = time.perf_counter()
+        with recorder.record(), profiler:
+            response = view_func(request, *view_args, **view_kwargs)
+            if hasattr(response, "render") and callable(response.render):
+                response.render()
+        elapsed = time.perf_counter() - start
+
+        os.makedirs(settings.CBCS_PROFILE_DIR, exist_ok=True)
+        base = os.path.join(settings.CBCS_PROFILE_DIR, f"{timezone.now():%Y%m%dT%H%M%S}-{name}-{os.getpid()}")
+        if SamplingProfiler:
+            profile_path = f"{base}.html"
+            with open(profile_path, "w") as output:
+                output.write(profiler.output_html())
+        else:
+            profile_path = f"{base}.prof"
+            profiler.dump_stats(profile_path)
+        with open(f"{base}.sql.json", "w") as output:
+            json.dump(
+                {
+                    "view": name,
+                    "method": request.method,
+                    "path": self.traced_path(request),
+                    "status": response.status_code,
+                    "ms": round(elapsed * 1000, 1),
+                    "db_ms": round(recorder.total * 1000, 1),
+                    "queries": recorder.count,
+                    "statements": recorder.statements,
+                },
+                output,
+                indent=2,
+            )
+        logger.warning("Profiled %s into %s", request.path, profile_path)
+        response[self.header] = os.path.basename(profile_path)
+        return response
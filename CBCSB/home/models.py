@@ -1,6 +1,12 @@
-from django.db import models
+import binascii
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Count, F, Q
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.contrib.auth.models import User
+from django.contrib.auth.models import User, UserManager
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
@@ -17,9 +23,43 @@ year_opt = (
         ("8", "Eighth Semester"),
     )
 
+class BatchQuerySet(models.QuerySet):
+    breakdown_fields = {
+        "department": "student__department",
+        "program": "student__program",
+        "sem": "student__sem",
+    }
+
+    def with_student_counts(self, **student_filters):
+        """Annotate ``student_count`` in one grouped query.
+
+        ``student_filters`` are Student lookups (e.g. ``department=dep``)
+        restricting which students are counted.
+        """
+        condition = Q(**{f"student__{k}": v for k, v in student_filters.items()}) if student_filters else None
+        return self.annotate(student_count=Count("student", filter=condition))
+
+    def student_breakdown(self, *fields):
+        """Student counts per batch, optionally split by department/program/sem.
+
+        Returns dicts with ``batch``, the requested fields and ``student_count``.
+        """
+        unknown = set(fields) - set(self.breakdown_fields)
+        if unknown:
+            raise ValueError(f"Unsupported breakdown fields: {', '.join(sorted(unknown))}")
+        group = {"batch": F("id"), **{f: F(self.breakdown_fields[f]) for f in fields}}
+        return (
+            self.filter(student__isnull=False)
+            .values(**group)
+            .annotate(student_count=Count("student"))
+            .order_by(*group)
+        )
+
 class Batch(models.Model):
     start_year = models.DateField(auto_now=False, auto_now_add=False, )
     end_year = models.DateField(auto_now=False, auto_now_add=False,)
+
+    objects = BatchQuerySet.as_manager()
     
     def __str__(self) -> str:
         return f'{self.start_year.year} - {self.end_year.year}'
@@ -51,6 +91,9 @@ class Batch(models.Model):
     
     @property
     def total_students(self):
+        # Batches from ``Batch.objects.with_student_counts()`` skip the per-row COUNT
+        if hasattr(self, "student_count"):
+            return self.student_count
         return self.student_set.count()
     
 
@@ -60,14 +103,20 @@ class Batch(models.Model):
         verbose_name_plural = "Batches"
         unique_together = ('start_year', 'end_year')
         
+class DepartmentManager(models.Manager):
+    # The HOD is part of every department's display name, so join it up front
+    def get_queryset(self):
+        return super().get_queryset().select_related("hod")
+
 class Department(models.Model):
     name = models.CharField(max_length=150)
 
+    objects = DepartmentManager()
+
     def __str__(self):
-        if HOD.objects.filter(department=self).exists():
-            hod = HOD.objects.get(department=self)
-            return f"{self.name} ({hod.username})"
-        else:
+        try:
+            return f"{self.name} ({self.hod.username})"
+        except HOD.DoesNotExist:
             return f"{self.name} (No HOD)"
         
     def get_programs(self):
@@ -165,6 +214,37 @@ class CourseStatus(models.Model):
         verbose_name = "Course Item"
         verbose_name_plural = "Course Items"
 
+class SemReportQuerySet(models.QuerySet):
+    def with_courses(self):
+        """Prefetch enrolled courses down to their program's department in one query."""
+        return self.prefetch_related(
+            models.Prefetch(
+                "enrolled_courses",
+                queryset=CourseStatus.objects.select_related("course__program__department"),
+            )
+        )
+
+    def pending(self):
+        """Reports waiting for the HOD: neither approved nor rejected."""
+        return self.filter(is_approved=False).filter(Q(reason_for_rejection="") | Q(reason_for_rejection__isnull=True))
+
+    def get_or_create_for(self, student, semester):
+        """Return the student's report for ``semester``, creating it if needed.
+
+        Unlike get_or_create(), concurrent callers cannot race each other
+        into an IntegrityError or a duplicate: the row is inserted with
+        ``INSERT ... ON CONFLICT DO NOTHING`` and then read back.
+        """
+        report = self.filter(student=student, semester=semester).first()
+        if report is None:
+            self.bulk_create(
+                [self.model(student=student, semester=semester, department_id=student.department_id)],
+                ignore_conflicts=True,
+            )
+            report = self.get(student=student, semester=semester)
+        report.student = student
+        return report
+
 class SemReport(models.Model):
     student = models.ForeignKey("home.Student", on_delete=models.CASCADE)
     semester = models.CharField(
@@ -175,14 +255,39 @@ class SemReport(models.Model):
     enrolled_courses = models.ManyToManyField(CourseStatus, related_name="SemesterReport", blank=True)
     is_approved = models.BooleanField(default=False,help_text="Do the report approved by HOD?")
     reason_for_rejection = models.TextField(blank=True, null=True)
+    # Maintained by home.enrollment on every enroll/unenroll; `manage.py backfillreports` recomputes them
+    total_credits = models.PositiveIntegerField(default=0, help_text="Credits of the enrolled courses")
+    course_count = models.PositiveIntegerField(default=0, help_text="Number of enrolled courses")
+    elective_count = models.PositiveIntegerField(default=0, help_text="Number of enrolled electives")
+    # Copy of student.department so the HOD review queue is served by one index
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        related_name="reports",
+    )
+
+    objects = SemReportQuerySet.as_manager()
     
     def __str__(self) -> str:
         course_codes = [course.course.code for course in self.enrolled_courses.all()]
         return f'{self.student.username} | Sem: {self.semester} | Courses: {course_codes}'
+
+    def save(self, *args, **kwargs):
+        if self.department_id is None and self.student_id is not None:
+            self.department_id = self.student.department_id
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = "Semester Report"
         verbose_name_plural = "Semester Reports"
+        indexes = [
+            models.Index(fields=["department", "semester", "is_approved"], name="semreport_review_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["student", "semester"], name="unique_student_semester_report"),
+        ]
 
 class HOD(User):
     department = models.OneToOneField(
@@ -202,6 +307,43 @@ class HOD(User):
         verbose_name = "Head of Department"
         verbose_name_plural = "Heads of Department"
 
+class StudentManager(UserManager):
+    def bulk_create_students(self, students, batch_size=None):
+        """Insert ``students`` with multi-row INSERTs into both tables.
+
+        QuerySet.bulk_create() refuses multi-table inherited models, so the
+        auth_user rows are inserted first and the home_student rows reuse the
+        returned keys. Passwords must already be hashed.
+        """
+        fields = self.model._meta.local_concrete_fields
+        size = max(connections[self.db].ops.bulk_batch_size(fields, students), 1)
+        if batch_size:
+            size = min(size, batch_size)
+        with transaction.atomic(using=self.db, savepoint=False):
+            User.objects.db_manager(self.db).bulk_create(students, batch_size=batch_size)
+            for student in students:
+                student.user_ptr_id = student.id
+            for start in range(0, len(students), size):
+                self._insert(students[start:start + size], fields=fields, using=self.db)
+        for student in students:
+            student._state.db = self.db
+        return students
+
+    def with_history(self, semester=None):
+        """Load students with everything their semester history serializes.
+
+        Reports (with courses) land in ``semester_reports``: all of them, or
+        only ``semester`` plus the student's current one. Four queries in
+        total, whatever the number of semesters and courses.
+        """
+        reports = SemReport.objects.with_courses().order_by("pk")
+        if semester:
+            reports = reports.filter(Q(semester=semester) | Q(semester=F("student__sem")))
+        return self.select_related("department", "program__department").prefetch_related(
+            models.Prefetch("batch", queryset=Batch.objects.with_student_counts()),
+            models.Prefetch("semreport_set", queryset=reports, to_attr="semester_reports"),
+        )
+
 class Student(User):
     department = models.ForeignKey(
         Department,
@@ -228,13 +370,19 @@ class Student(User):
         blank=True,
         related_name="Student_history",
     )
+
+    objects = StudentManager()
     
     def __str__(self) -> str:
         return f'{self.username}'
     
     @property
     def enrolled_courses(self):
-        current_sem_report = self.semreport_set.filter(semester=self.sem).first()
+        if hasattr(self, "semester_reports"):
+            # Prefetched by StudentManager.with_history()
+            current_sem_report = next((r for r in self.semester_reports if r.semester == self.sem), None)
+        else:
+            current_sem_report = self.semreport_set.filter(semester=self.sem).first()
         if current_sem_report:
             return current_sem_report.enrolled_courses.all()
         return []
@@ -242,3 +390,128 @@ class Student(User):
     class Meta:
         verbose_name = "Student"
         verbose_name_plural = "Students"
+
+class AuthTokenQuerySet(models.QuerySet):
+    def expired(self, now=None):
+        return self.filter(expires__lte=now or timezone.now())
+
+    def for_department(self, department):
+        return self.filter(Q(user__hod__department=department) | Q(user__student__department=department))
+
+    def for_batch(self, batch):
+        return self.filter(user__student__batch=batch)
+
+    def revoke(self):
+        """Delete the selected tokens; returns how many were revoked."""
+        return self.delete()[1].get(self.model._meta.label, 0)
+
+class AuthTokenManager(models.Manager.from_queryset(AuthTokenQuerySet)):
+    def rotate(self, user, current=None):
+        """Replace ``user``'s token with a fresh one.
+
+        When the caller already loaded the user's ``current`` token it is
+        re-keyed in place with a single UPDATE.
+        """
+        if current is not None:
+            token = self.rekey(user, self.filter(pk=current.pk))
+            if token is not None:
+                return token
+        try:
+            with transaction.atomic(using=self.db):
+                self.filter(user=user).delete()
+                return self.create(user=user)
+        except IntegrityError:
+            # A concurrent login created the user's first token in between; re-key that one
+            return self.rekey(user, self.filter(user=user)) or self.create(user=user)
+
+    def rekey(self, user, tokens):
+        """Give ``user``'s token in ``tokens`` a fresh key and expiry; None if there is none."""
+        now = timezone.now()
+        token = self.model(user=user, key=self.model.generate_key(), created=now, expires=self.model.expiry_from(now))
+        if not tokens.update(key=token.key, created=token.created, expires=token.expires):
+            return None
+        token._state.adding = False
+        token._state.db = self.db
+        return token
+
+class AuthToken(models.Model):
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="cbcs_token")
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
+    @staticmethod
+    def generate_key():
+        return binascii.hexlify(os.urandom(20)).decode()
+
+    @staticmethod
+    def expiry_from(issued):
+        return issued + timedelta(seconds=settings.CBCS_TOKEN_LIFETIME)
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = self.generate_key()
+        if not self.expires:
+            self.expires = self.expiry_from(timezone.now())
+        super().save(*args, **kwargs)
+
+    @property
+    def is_expired(self):
+        return self.expires <= timezone.now()
+
+    def __str__(self) -> str:
+        return f'{self.user_id} | expires {self.expires:%Y-%m-%d %H:%M}'
+
+    class Meta:
+        verbose_name = "Auth Token"
+        verbose_name_plural = "Auth Tokens"
+
+class ImportJob(models.Model):
+    STUDENTS = "students"
+    COURSES = "courses"
+    CURRICULUM = "curriculum"
+
+    QUEUED = "Q"
+    RUNNING = "R"
+    DONE = "D"
+    FAILED = "F"
+
+    kind = models.CharField(
+        max_length=20,
+        choices=[
+            (STUDENTS, "Student import"),
+            (COURSES, "Course import"),
+            (CURRICULUM, "Curriculum import"),
+        ],
+    )
+    status = models.CharField(
+        max_length=1,
+        choices=[
+            (QUEUED, "Queued"),
+            (RUNNING, "Running"),
+            (DONE, "Done"),
+            (FAILED, "Failed"),
+        ],
+        default=QUEUED,
+        db_index=True,
+    )
+    file = models.FileField(upload_to="imports/", blank=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="import_jobs")
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    params = models.JSONField(default=dict, blank=True, help_text="Extra importer arguments, e.g. the program")
+    total_rows = models.IntegerField(default=0)
+    processed_rows = models.IntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, help_text="Per-row success/error report")
+    created_on = models.DateTimeField(auto_now_add=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    heartbeat_on = models.DateTimeField(null=True, blank=True, help_text="Last progress report of the running worker")
+    finished_on = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f'{self.get_kind_display()} #{self.pk} | {self.get_status_display()}'
+
+    class Meta:
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
@@ -0,0 +1,65 @@
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination
+
+from . import serializers
+
+
+class StudentCursorPagination(CursorPagination):
+    """Keyset pagination over student IDs: ``?limit=`` sets the page size and
+    the returned ``next``/``previous`` URLs carry an opaque ``cursor``."""
+
+    ordering = "pk"
+    page_size = 100
+    page_size_query_param = "limit"
+    max_page_size = 1000
+
+
+class ReportCursorPagination(StudentCursorPagination):
+    """Keyset pagination over semester report IDs."""
+
+
+def wants_page(request):
+    return "cursor" in request.query_params or "limit" in request.query_params
+
+
+def requested_fields(request):
+    """Field names from ``?fields=id,username,...``, or None for every field."""
+    fields = request.query_params.get("fields")
+    return [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+
+
+def filter_students(queryset, params):
+    """Narrow ``queryset`` by the ``batch``, ``program``, ``sem`` and ``search`` parameters.
+
+    Invalid values raise a DRF ValidationError, answered with a 400.
+    """
+    filters = serializers.StudentFilterSerial(data=params)
+    filters.is_valid(raise_exception=True)
+    params = filters.validated_data
+    for name in ("batch", "program", "sem"):
+        if name in params:
+            queryset = queryset.filter(**{name: params[name]})
+    search = params.get("search", "").strip()
+    if search:
+        queryset = queryset.filter(
+            Q(username__icontains=search)
+            | Q(first_name__icontains=search)
+            | Q(last_name__icontains=search)
+            | Q(email__icontains=search)
+        )
+    return queryset
+
+
+def student_listing(request, queryset):
+    """Filter ``queryset`` by the request's parameters and serialize it.
+
+    The plain list is returned unless ``cursor`` or ``limit`` is given, in
+    which case one page is returned as ``{"next", "previous", "results"}``.
+    """
+    queryset = filter_students(queryset.select_related("department"), request.query_params)
+    fields = requested_fields(request)
+    if not wants_page(request):
+        return serializers.StudentSerializer(queryset, many=True, fields=fields).data
+    paginator = StudentCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_response(serializers.StudentSerializer(page, many=True, fields=fields).data).data
@@ -0,0 +1,18 @@
+from rest_framework.permissions import BasePermission
+
+from .authentication import is_hod, is_student
+
+
+class IsHOD(BasePermission):
+    message = "Only Heads of Department can access this page."
+
+    def has_permission(self, request, view):
+        return bool(request.user and is_hod(request.user))
+
+
+class IsStudent(BasePermission):
+    message = "Only Students can access this page."
+
+    def has_permission(self, request, view):
+        return bool(request.user and is_student(request.user))
+
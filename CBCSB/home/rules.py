@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db.models import Q
+
+from . import cache, models
+
+
+def eligible_courses(program_id, batch_id, semester):
+    """``{course id: (name, credit, is_optional)}`` open to a program, batch and semester.
+
+    Courses not tied to any batch are open to every batch. The result is
+    cached with the catalog, so it is rebuilt only after courses change.
+    """
+    def build():
+        courses = (
+            models.Course.objects.filter(program_id=program_id, semester=semester)
+            .filter(Q(batch=batch_id) | Q(batch=None))
+            .distinct()
+            .values_list("pk", "name", "courseCredit", "is_optional")
+        )
+        return {pk: (name, credit, optional) for pk, name, credit, optional in courses}
+
+    return cache.cached_response("eligible_courses", [program_id, batch_id, semester], build)
+
+
+class EnrollmentRules:
+    """What a student may enroll in for one semester: the eligible courses and the credit limit."""
+
+    def __init__(self, student, semester):
+        self.courses = eligible_courses(student.program_id, student.batch_id, semester)
+        self.max_credits = settings.CBCS_MAX_SEMESTER_CREDITS
+
+    def is_eligible(self, pk):
+        return pk in self.courses
+
+    def credit(self, pk):
+        return self.courses[pk][1]
+
+    def reject(self, pk, credits, enrolled):
+        """Why eligible course ``pk`` cannot join a report holding ``credits`` and ``enrolled``; None if it can."""
+        name, credit, _ = self.courses[pk]
+        if pk in enrolled:
+            return f"{name} is already enrolled."
+        if credits + credit > self.max_credits:
+            return f"{name} would exceed the limit of {self.max_credits} credits."
+        return None
@@ -1,6 +1,6 @@
 # serializers.py
 from rest_framework import serializers
-from .models import HOD, Student,Course,Department,Batch,Program,SemReport,CourseStatus
+from .models import HOD, Student,Course,Department,Batch,Program,SemReport,CourseStatus,ImportJob,year_opt
 
 class DepartmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -72,6 +72,14 @@ class StudentSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'password', 'email', 'department',"program","batch","sem","first_name","last_name","joined_date"]
         extra_kwargs = {'password': {'write_only': True},"current_semester":{'read_only':True}, "first_name":{"required":False},"last_name":{"required":False},"joined_date":{"required":False}}
 
+    def __init__(self, *args, **kwargs):
+        # Optional sparse fieldset, e.g. fields=["id", "username"]
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def create(self, validated_data):
         student = Student.objects.create_user(**validated_data)
         return student
@@ -79,7 +87,8 @@ class StudentSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         # Replace the department ID with the serialized data
-        representation['department'] = DepartmentSerializer(instance.department).data
+        if 'department' in representation:
+            representation['department'] = DepartmentSerializer(instance.department).data
         return representation
 
 class LoginSerial(serializers.Serializer):
@@ -92,6 +101,11 @@ class ReportSerial(serializers.ModelSerializer):
         model = SemReport
         fields = "__all__"
     
+class ReviewReportSerial(ReportSerial):
+    username = serializers.CharField(source="student.username", read_only=True)
+    first_name = serializers.CharField(source="student.first_name", read_only=True)
+    last_name = serializers.CharField(source="student.last_name", read_only=True)
+
 class StudentSendSerial(serializers.ModelSerializer):
     department = DepartmentSerializer()
     program = ProgramSerial()
@@ -109,12 +123,30 @@ class StudentUploadSerializer(serializers.ModelSerializer):
         
     def validate_file(self, value):
         # Add validation for file type if necessary
-        if not value.name.endswith(('.xlsx', '.xls')):
-            raise serializers.ValidationError("Uploaded file is not an Excel file.")
+        if not value.name.endswith(('.xlsx', '.xls', '.csv')):
+            raise serializers.ValidationError("Uploaded file is not an Excel or CSV file.")
         return value
 
 class CourseUploadSerializer(serializers.ModelSerializer):
     file = serializers.FileField(required=True)
     class Meta:
         model = Course
-        field = ["name","code"]
\ No newline at end of file
+        field = ["name","code"]
+
+class ImportJobSerial(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = ["id", "kind", "status", "total_rows", "processed_rows", "result", "created_on", "started_on", "finished_on"]
+
+class StudentFilterSerial(serializers.Serializer):
+    # Query parameters of the student listings (see home/pagination.py)
+    batch = serializers.IntegerField(required=False)
+    program = serializers.IntegerField(required=False)
+    sem = serializers.ChoiceField(choices=year_opt, required=False)
+    search = serializers.CharField(required=False, allow_blank=True)
+
+class ReportExportSerial(serializers.Serializer):
+    # Query parameters of the report export
+    filetype = serializers.ChoiceField(choices=["xlsx", "csv"], default="xlsx")
+    batch = serializers.IntegerField(required=False)
+    sem = serializers.ChoiceField(choices=year_opt, required=False)
@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, models
+from .authentication import evict_users, token_cache
+
+# Catalog responses embed programs, departments, batches (with student
+# counts) and courses, so any write to these invalidates them.
+CATALOG_MODELS = [models.Course, models.Program, models.Batch, models.Department, models.Student]
+
+
+def invalidate_catalog(sender, **kwargs):
+    cache.invalidate_catalog()
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_catalog, sender=model, dispatch_uid=f"catalog-save-{model.__name__}")
+    post_delete.connect(invalidate_catalog, sender=model, dispatch_uid=f"catalog-delete-{model.__name__}")
+
+
+@receiver(m2m_changed, sender=models.Course.batch.through)
+def invalidate_catalog_on_course_batches(sender, action, **kwargs):
+    if action.startswith("post_"):
+        cache.invalidate_catalog()
+
+
+@receiver(post_delete, sender=models.AuthToken)
+def evict_deleted_token(sender, instance, **kwargs):
+    token_cache.evict(instance.key)
+
+
+def evict_user_tokens(sender, instance, **kwargs):
+    # Cached credentials embed the user and its HOD/Student row
+    evict_users([instance.pk])
+
+
+for model in [User, models.HOD, models.Student]:
+    post_save.connect(evict_user_tokens, sender=model, dispatch_uid=f"token-cache-save-{model.__name__}")
+    post_delete.connect(evict_user_tokens, sender=model, dispatch_uid=f"token-cache-delete-{model.__name__}")
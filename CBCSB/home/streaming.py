@@ -0,0 +1,83 @@
+import json
+from collections.abc import Iterator
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import pagination, serializers
+from .importers import chunked
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def stream_format(request):
+    """The format asked for with ``?stream=json|ndjson``, or None."""
+    fmt = request.query_params.get("stream")
+    return fmt if fmt in CONTENT_TYPES else None
+
+
+def dumps(value):
+    return json.dumps(value, cls=JSONEncoder, ensure_ascii=False)
+
+
+def serialize_rows(queryset, serializer_class, chunk_size=None, **kwargs):
+    """Yield the serialized objects of ``queryset``, reading ``chunk_size`` rows at a time.
+
+    Rows are fetched with ``.iterator()``, so only one chunk of model
+    instances is held in memory (prefetches also run per chunk).
+    """
+    chunk_size = chunk_size or settings.CBCS_STREAM_CHUNK_SIZE
+    for chunk in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        yield from serializer_class(chunk, many=True, **kwargs).data
+
+
+def student_rows(request, queryset):
+    """Serialized students of ``queryset`` with the filters and ``?fields=`` of a student listing."""
+    queryset = pagination.filter_students(queryset.select_related("department"), request.query_params)
+    return serialize_rows(queryset.order_by("pk"), serializers.StudentSerializer, fields=pagination.requested_fields(request))
+
+
+def json_chunks(value):
+    """Encode ``value`` as JSON text, writing any iterator inside it item by item."""
+    if isinstance(value, dict):
+        yield "{"
+        for i, (key, item) in enumerate(value.items()):
+            yield f'{"," if i else ""}{dumps(key)}:'
+            yield from json_chunks(item)
+        yield "}"
+    elif isinstance(value, Iterator):
+        yield "["
+        for i, item in enumerate(value):
+            yield f'{"," if i else ""}{dumps(item)}'
+        yield "]"
+    else:
+        yield dumps(value)
+
+
+def ndjson_chunks(value):
+    """Encode ``value`` as one JSON document per line.
+
+    An iterator yields one line per item. For a dict, its plain values come
+    first as one line, followed by a ``{key: item}`` line per item of each
+    iterator it holds.
+    """
+    if isinstance(value, Iterator):
+        for item in value:
+            yield dumps(item) + "\n"
+        return
+    yield dumps({key: item for key, item in value.items() if not isinstance(item, Iterator)}) + "\n"
+    for key, items in value.items():
+        if isinstance(items, Iterator):
+            for item in items:
+                yield dumps({key: item}) + "\n"
+
+
+def response(request, value):
+    """StreamingHttpResponse writing ``value`` in the requested ``?stream=`` format."""
+    fmt = stream_format(request)
+    chunks = json_chunks(value) if fmt == "json" else ndjson_chunks(value)
+    return StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
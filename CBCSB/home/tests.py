@@ -1,3 +1,772 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import openpyxl
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import authentication, cache, enrollment, importers, jobs, models
+
+
+class Fixtures:
+    """Row factories shared by the test cases below."""
+
+    seq = 0
+
+    def next_seq(self):
+        self.seq += 1
+        return self.seq
+
+    def make_department(self, name="CSE"):
+        return models.Department.objects.create(name=name)
+
+    def make_program(self, department, name="BE"):
+        return models.Program.objects.create(name=name, department=department)
+
+    def make_batch(self, start=2023):
+        return models.Batch.objects.create(start_year=datetime.date(start, 1, 1), end_year=datetime.date(start + 4, 1, 1))
+
+    def make_catalog(self):
+        """Sets self.department, self.program and self.batch to one CSE/BE/2023 row each."""
+        self.department = self.make_department()
+        self.program = self.make_program(self.department)
+        self.batch = self.make_batch()
+
+    def make_student(self, username="stud", program=None, batch=None, sem="1", password=None, **fields):
+        program = program or self.program
+        return models.Student.objects.create_user(
+            username=username, password=password, department=program.department, program=program,
+            batch=batch or self.batch, sem=sem, **fields,
+        )
+
+    def make_hod(self, department=None, username="hod", password=None):
+        return models.HOD.objects.create_user(username=username, password=password, department=department or self.department)
+
+    def make_course(self, code, program=None, semester="1", courseCredit=3, **fields):
+        program = program or self.program
+        return models.Course.objects.create(
+            name=code, code=code, semester=semester, courseCredit=courseCredit,
+            department=program.department, program=program, **fields,
+        )
+
+    def authenticate(self, user, client=None):
+        client = client or self.client
+        client.force_authenticate(user=User.objects.get(pk=user.pk))
+        return client
+
+
+class HodDashBoardQueryTest(Fixtures, TestCase):
+    def setUp(self):
+        self.department = self.make_department()
+        self.hod = self.make_hod(password="hod")
+        self.client = APIClient()
+
+    def populate(self, count):
+        for _ in range(count):
+            seq = self.next_seq()
+            batch = self.make_batch(2000 + seq)
+            program = self.make_program(self.department, f"P{seq}")
+            self.make_course(f"C{seq}", program).batch.add(batch)
+            self.make_student(f"s{seq}", program, batch)
+
+    def dashboard_queries(self):
+        self.authenticate(self.hod)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/hodDash/")
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_query_count_is_constant(self):
+        self.populate(2)
+        small, _ = self.dashboard_queries()
+        self.populate(20)
+        large, data = self.dashboard_queries()
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 8)
+        self.assertEqual(len(data["students"]), 22)
+        self.assertEqual(data["courses"][0]["batch"][0]["total_students"], 1)
+        self.assertEqual(data["batchs"][0]["total_students"], 1)
+
+
+class BatchStatisticsTest(Fixtures, TestCase):
+    def test_counts_and_breakdown(self):
+        self.make_catalog()
+        batch = self.batch
+        self.make_batch(2024)
+        for i, sem in enumerate(["1", "1", "3"]):
+            self.make_student(f"s{i}", sem=sem)
+
+        with self.assertNumQueries(1):
+            counts = {b.pk: b.total_students for b in models.Batch.objects.with_student_counts()}
+        self.assertEqual(sorted(counts.values()), [0, 3])
+
+        breakdown = list(models.Batch.objects.student_breakdown("sem"))
+        self.assertEqual(
+            breakdown,
+            [
+                {"batch": batch.pk, "sem": "1", "student_count": 2},
+                {"batch": batch.pk, "sem": "3", "student_count": 1},
+            ],
+        )
+
+
+class AdminChangelistQueryTest(Fixtures, TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password=None)
+        self.batch = self.make_batch()
+
+    def populate(self, count):
+        for _ in range(count):
+            seq = self.next_seq()
+            department = self.make_department(f"D{seq}")
+            self.make_hod(department, f"hod{seq}")
+            program = self.make_program(department, f"P{seq}")
+            course = self.make_course(f"C{seq}", program)
+            course.batch.add(self.batch)
+            models.CourseStatus.objects.create(course=course, status="E", semester="1")
+            models.SemReport.objects.create(student=self.make_student(f"s{seq}", program), semester="1")
+
+    def changelist_queries(self, url):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelists_render_in_fixed_queries(self):
+        urls = [f"/admin/home/{name}/" for name in ("department", "program", "student", "hod", "course", "semreport", "coursestatus")]
+        self.populate(2)
+        small = [self.changelist_queries(url) for url in urls]
+        self.populate(10)
+        large = [self.changelist_queries(url) for url in urls]
+        self.assertEqual(small, large)
+
+
+class StudentEnrollmentTest(Fixtures, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.student = self.make_student()
+        self.courses = [self.make_course(f"C{i}") for i in range(6)]
+        self.client = APIClient()
+
+    def post(self, kind, ids):
+        self.authenticate(self.student)
+        return self.client.post("/studDash/", {"type": kind, "CourseIDs": ids}, format="json")
+
+    def test_enroll_reports_per_course_results(self):
+        first, second = self.courses[0].pk, self.courses[1].pk
+        self.post("enroll", [first])
+        response = self.post("enroll", [first, second, second, 999999])
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data["message"], ["C1 enrolled successfully."])
+        self.assertEqual(
+            response.data["errors"],
+            ["C0 is already enrolled.", "C1 is already enrolled.", "Course with ID 999999 does not exist."],
+        )
+        report = models.SemReport.objects.get(student=self.student, semester="1")
+        self.assertEqual(sorted(report.enrolled_courses.values_list("course_id", flat=True)), [first, second])
+
+    def test_enroll_query_count_is_constant(self):
+        models.SemReport.objects.create(student=self.student, semester="1")
+        self.post("enroll", [])  # builds the cached enrollment rules
+        with CaptureQueriesContext(connection) as small:
+            self.post("enroll", [self.courses[0].pk])
+        with CaptureQueriesContext(connection) as large:
+            self.post("enroll", [c.pk for c in self.courses[1:]])
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_unenroll_reports_missing_ids(self):
+        enrolled = [c.pk for c in self.courses[:4]]
+        self.post("enroll", enrolled)
+        response = self.post("unenroll", enrolled + [self.courses[5].pk, 999999])
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(len(response.data["message"]), 4)
+        self.assertEqual(response.data["missing"], [self.courses[5].pk, 999999])
+        self.assertFalse(models.CourseStatus.objects.exists())
+
+    def test_approved_reports_cannot_change(self):
+        report = models.SemReport.objects.get_or_create_for(self.student, "1")
+        models.SemReport.objects.filter(pk=report.pk).update(is_approved=True)
+        self.authenticate(self.student)
+        response = self.client.post("/selectcourse/1/", {"CourseIDs": [self.courses[0].pk]}, format="json")
+        self.assertEqual(response.status_code, 403)
+        # A report approved after it was read is still refused
+        with self.assertRaises(PermissionDenied):
+            enrollment.enroll_courses(report, [self.courses[0].pk], self.student)
+        with self.assertRaises(PermissionDenied):
+            enrollment.unenroll_courses(report, [self.courses[0].pk])
+        self.assertFalse(models.CourseStatus.objects.exists())
+
+    def test_enroll_checks_eligibility_and_credit_limit(self):
+        self.courses[1].batch.add(self.make_batch(2024))
+        self.courses[2].semester = "2"
+        self.courses[2].save()
+        self.authenticate(self.student)
+        offered = [course["code"] for course in self.client.get("/studDash/").data["avail_courses"]]
+        self.assertEqual(offered, ["C0", "C3", "C4", "C5"])
+        offered = [course["code"] for course in self.client.get("/selectcourse/1/").data["avail_courses"]]
+        self.assertEqual(offered, ["C0", "C3", "C4", "C5"])
+        with override_settings(CBCS_MAX_SEMESTER_CREDITS=7):
+            response = self.post("enroll", [c.pk for c in self.courses[:5]])
+        self.assertEqual(response.data["message"], ["C0 enrolled successfully.", "C3 enrolled successfully."])
+        self.assertEqual(
+            response.data["errors"],
+            [
+                "C1 is not offered for your program, batch and semester.",
+                "C2 is not offered for your program, batch and semester.",
+                "C4 would exceed the limit of 7 credits.",
+            ],
+        )
+
+    def test_report_totals_follow_enrollment(self):
+        self.courses[1].is_optional = True
+        self.courses[1].save()
+        self.post("enroll", [c.pk for c in self.courses[:3]])
+        self.post("unenroll", [self.courses[0].pk])
+        report = models.SemReport.objects.get(student=self.student, semester="1")
+        self.assertEqual((report.total_credits, report.course_count, report.elective_count), (6, 2, 1))
+
+        models.SemReport.objects.update(total_credits=0, course_count=0, elective_count=0)
+        call_command("backfillreports", stdout=io.StringIO())
+        report.refresh_from_db()
+        self.assertEqual((report.total_credits, report.course_count, report.elective_count), (6, 2, 1))
+
+    def test_unenroll_after_a_credit_change(self):
+        self.post("enroll", [c.pk for c in self.courses[:2]])
+        models.Course.objects.filter(pk=self.courses[0].pk).update(courseCredit=8)
+        response = self.post("unenroll", [self.courses[0].pk])
+        self.assertEqual(response.status_code, 200)
+        report = models.SemReport.objects.get(student=self.student, semester="1")
+        self.assertEqual((report.total_credits, report.course_count), (3, 1))
+        self.assertEqual(list(report.enrolled_courses.values_list("course_id", flat=True)), [self.courses[1].pk])
+
+
+class StudentBulkImportTest(Fixtures, TestCase):
+    header = ["Username", "email", "first_name", "last_name", "Semester (number)", "Batch Start Year", "Batch End Year", "DOJ"]
+
+    def setUp(self):
+        self.make_catalog()
+        self.hod = self.make_hod()
+        self.make_student("taken")
+        self.client = self.authenticate(self.hod, APIClient())
+
+    def upload(self, rows):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(self.header)
+        for row in rows:
+            workbook.active.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        upload = SimpleUploadedFile("students.xlsx", content.getvalue())
+        return self.client.post("/studentblukregister/", {"file": upload, "program": self.program.pk})
+
+    @override_settings(CBCS_IMPORT_CHUNK_SIZE=2)
+    def test_import_reports_successes_and_errors(self):
+        response = self.upload([
+            ["23CS001", "a@example.com", "A", "One", 1, 2023, 2027, None],
+            ["23CS002", "b@example.com", "B", "Two", 3.0, 2023, 2027, None],
+            ["23CS001", "c@example.com", "C", "Three", 1, 2023, 2027, None],
+            ["taken", "d@example.com", "D", "Four", 1, 2023, 2027, None],
+            ["23CS005", "e@example.com", "E", "Five", 1, 2019, 2023, None],
+            ["23CS006", "not-an-email", "F", "Six", 1, 2023, 2027, None],
+        ])
+        self.assertEqual(response.status_code, 201)
+        details = response.data["details"]
+        self.assertEqual([s["id"] for s in details["success"]], ["23CS001", "23CS002"])
+        self.assertEqual([e["id"] for e in details["error"]], ["23CS001", "taken", "23CS005", "23CS006"])
+        student = models.Student.objects.get(username="23CS002")
+        self.assertEqual((student.sem, student.department, student.program), ("3", self.department, self.program))
+        self.assertTrue(student.check_password("23CS002"))
+
+    def test_background_import_reports_progress(self):
+        content = "\n".join([
+            ",".join(self.header),
+            "23CS001,a@example.com,A,One,1,2023,2027,",
+            "taken,b@example.com,B,Two,1,2023,2027,",
+        ])
+        upload = SimpleUploadedFile("students.csv", content.encode())
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            response = self.client.post("/studentblukregister/", {"file": upload, "program": self.program.pk, "async": "true"})
+            self.assertEqual(response.status_code, 202)
+            self.assertFalse(models.Student.objects.filter(username="23CS001").exists())
+            jobs.work(once=True)
+
+        status = self.client.get(f"/jobs/{response.data['job']}/").data
+        self.assertEqual((status["status"], status["total_rows"], status["processed_rows"]), ("D", 2, 2))
+        details = status["result"]["details"]
+        self.assertEqual([s["id"] for s in details["success"]], ["23CS001"])
+        self.assertEqual([e["id"] for e in details["error"]], ["taken"])
+
+    def test_progress_counts_written_chunks(self):
+        rows = [
+            {"Username": f"23CS00{n}", "Semester (number)": 1, "Batch Start Year": 2023, "Batch End Year": 2027}
+            for n in range(3)
+        ]
+        written = []
+        importer = importers.StudentImporter(self.department, self.program, chunk_size=2, hash_workers=1)
+        importer.run(rows, progress=lambda done: written.append((done, models.Student.objects.filter(username__startswith="23CS").count())))
+        self.assertEqual(written, [(2, 2), (3, 3)])
+
+    def test_abandoned_jobs_are_failed(self):
+        started = timezone.now() - datetime.timedelta(hours=2)
+        job = models.ImportJob.objects.create(
+            kind=models.ImportJob.STUDENTS, owner=self.hod, department=self.department, status=models.ImportJob.RUNNING,
+            started_on=started, heartbeat_on=started, total_rows=10, processed_rows=4,
+        )
+        # Started as long ago, but its worker is still reporting progress
+        busy = models.ImportJob.objects.create(
+            kind=models.ImportJob.STUDENTS, owner=self.hod, department=self.department, status=models.ImportJob.RUNNING,
+            started_on=started, heartbeat_on=timezone.now(),
+        )
+        with override_settings(CBCS_JOB_STALE_AFTER=3600):
+            self.assertEqual(jobs.reclaim_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.ImportJob.FAILED)
+        self.assertIn("after 4 of 10 rows", job.result["error"])
+        busy.refresh_from_db()
+        self.assertEqual(busy.status, models.ImportJob.RUNNING)
+
+    def test_a_reclaimed_job_stays_failed(self):
+        upload = SimpleUploadedFile("students.csv", (",".join(self.header) + "\n23CS001,,,,1,2023,2027,").encode())
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            job = jobs.enqueue(models.ImportJob.STUDENTS, upload, self.hod, self.department, program=self.program.pk)
+            job = jobs.claim_next()
+            models.ImportJob.objects.filter(pk=job.pk).update(status=models.ImportJob.FAILED)
+            jobs.run(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.ImportJob.FAILED)
+
+
+class CurriculumImportTest(Fixtures, TestCase):
+    header = ["Subject Name", "Subject Code", "Course Credit", "Semester (number)", "Program", "Batch Start Year", "Batch End Year"]
+
+    def setUp(self):
+        self.make_catalog()
+        self.hod = self.make_hod()
+        self.client = APIClient()
+
+    def upload(self, rows):
+        self.authenticate(self.hod)
+        workbook = openpyxl.Workbook()
+        workbook.active.title = "Sheet1"
+        workbook.active.append(self.header)
+        for row in rows:
+            workbook.active.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        upload = SimpleUploadedFile("curriculum.xlsx", content.getvalue())
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/hodDash/", {"file": upload, "type": "BulkCourseUpload"})
+        self.assertEqual(response.status_code, 201)
+        return len(ctx.captured_queries), response.data["details"]
+
+    def test_queries_do_not_grow_with_rows(self):
+        row = lambda n: [f"Subject {n}", f"CS{n:03d}", 3, 1, self.program.pk, 2023, 2027]
+        small, _ = self.upload([row(0)])
+        large, details = self.upload([row(n) for n in range(1, 60)] + [row(0), ["Bad", "CS999", 3, 1, 999, 2023, 2027]])
+        self.assertEqual(small, large)
+        self.assertEqual(len(details["success"]), 59)
+        self.assertCountEqual(details["error"], ["Subject 0 already exists.", 'Bad: Program "999" does not exist.'])
+        self.assertEqual(self.batch.courses.count(), 60)
+
+
+class CatalogCacheTest(Fixtures, TestCase):
+    def setUp(self):
+        self.department = self.make_department()
+        self.hod = self.make_hod()
+        self.make_program(self.department)
+        self.client = APIClient()
+        cache.reset_stats()
+
+    def get_programs(self):
+        self.authenticate(self.hod)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/programs/")
+        return len(ctx.captured_queries), [p["name"] for p in response.data]
+
+    def test_programs_are_cached_until_a_program_changes(self):
+        miss, names = self.get_programs()
+        hit, cached = self.get_programs()
+        self.assertEqual(cached, names)
+        self.assertLess(hit, miss)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+        self.make_program(self.department, "ME")
+        _, names = self.get_programs()
+        self.assertEqual(names, ["BE", "ME"])
+
+    def test_lost_version_key_never_reuses_a_version(self):
+        _, names = self.get_programs()
+        cache.get_cache().delete(cache.VERSION_KEY)
+        cache.invalidate_catalog()
+        models.Program.objects.filter(name="BE").update(name="EEE")  # no signal
+        cache.get_cache().delete(cache.VERSION_KEY)
+        _, names = self.get_programs()
+        self.assertEqual(names, ["EEE"])
+
+
+class RoleResolutionTest(Fixtures, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.student = self.make_student()
+        self.hod = self.make_hod()
+        self.client = APIClient()
+
+    def test_token_user_and_role_load_in_one_query(self):
+        token = models.AuthToken.objects.create(user=self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.client.get("/getCourses/")
+        authentication.token_cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get("/getCourses/")
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get("/getCourses/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_token_is_evicted_on_delete(self):
+        token = models.AuthToken.objects.create(user=self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(self.client.get("/getCourses/").status_code, 200)
+        token.delete()
+        self.assertEqual(self.client.get("/getCourses/").status_code, 401)
+
+    def test_semester_promotion_reaches_cached_logins(self):
+        token = models.AuthToken.objects.create(user=self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(self.client.get("/studDash/").data["current_sem"], "1")
+        student_admin = admin.site._registry[models.Student]
+        student_admin.Set_Semester_2(None, models.Student.objects.filter(pk=self.student.pk))
+        self.assertEqual(self.client.get("/studDash/").data["current_sem"], "2")
+
+        # Rows changed behind the cache's back are still read as they are now
+        models.Student.objects.filter(pk=self.student.pk).update(sem="3")
+        self.assertEqual(self.client.get("/studDash/").data["current_sem"], "3")
+        batch = self.make_batch(2024)
+        self.make_course("C0", semester="3").batch.add(batch)
+        models.Student.objects.filter(pk=self.student.pk).update(batch=batch)
+        self.assertEqual([c["code"] for c in self.client.get("/studDash/").data["avail_courses"]], ["C0"])
+        models.Student.objects.filter(pk=self.student.pk).update(sem="4")
+        self.client.post("/studDash/", {"type": "unenroll", "CourseIDs": []}, format="json")
+        self.assertEqual(
+            list(models.SemReport.objects.filter(student=self.student).order_by("semester").values_list("semester", flat=True)),
+            ["1", "2", "3", "4"],
+        )
+
+    def test_shared_cache_evictions_reach_every_process(self):
+        token = models.AuthToken.objects.create(user=self.student)
+        credentials = (self.student, token)
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            worker, other = (authentication.TokenCache(10, 60, "default") for _ in range(2))
+            worker.set(token.key, credentials)
+            self.assertIsNotNone(other.get(token.key))
+            other.evict(token.key)
+            self.assertIsNone(worker.get(token.key))
+
+    def test_get_role_caches_subclass_rows(self):
+        user = User.objects.get(pk=self.hod.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(authentication.get_role(user), authentication.HOD)
+            self.assertEqual(user.hod.department.name, "CSE")
+            self.assertTrue(authentication.is_hod(user))
+
+    def test_role_permissions(self):
+        self.authenticate(self.student)
+        self.assertEqual(self.client.get("/hodDash/").status_code, 403)
+
+
+class AuthTokenTest(Fixtures, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.student = self.make_student(password="stud")
+        self.client = APIClient()
+
+    def test_login_rotates_token(self):
+        first = self.client.post("/login/", {"username": "stud", "password": "stud"}).data["token"]
+        second = self.client.post("/login/", {"username": "stud", "password": "stud"}).data["token"]
+        self.assertNotEqual(first, second)
+        self.assertEqual(list(models.AuthToken.objects.values_list("key", flat=True)), [second])
+
+    def test_concurrent_first_logins_share_one_token(self):
+        # The other login committed its token after this one found none, so our insert conflicts
+        other = models.AuthToken.objects.create(user=self.student)
+        with mock.patch.object(models.AuthTokenManager, "create", side_effect=IntegrityError):
+            token = models.AuthToken.objects.rotate(self.student)
+        self.assertNotEqual(token.key, other.key)
+        self.assertEqual(list(models.AuthToken.objects.values_list("key", flat=True)), [token.key])
+
+    def test_expired_token_is_rejected(self):
+        token = models.AuthToken.objects.create(user=self.student, expires=timezone.now() - datetime.timedelta(seconds=1))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(self.client.get("/getCourses/").status_code, 401)
+
+    def test_bulk_revocation(self):
+        hod = self.make_hod()
+        models.AuthToken.objects.create(user=self.student)
+        models.AuthToken.objects.create(user=hod)
+        self.assertEqual(models.AuthToken.objects.for_batch(self.batch).revoke(), 1)
+        self.assertEqual(models.AuthToken.objects.for_department(self.department).revoke(), 1)
+
+    def test_login_costs_one_read_and_one_write(self):
+        self.client.post("/login/", {"username": "stud", "password": "stud"})
+        with self.assertNumQueries(2):
+            response = self.client.post("/login/", {"username": "stud", "password": "stud"})
+        self.assertEqual(response.data["user_type"], "Student")
+        self.assertEqual(self.client.post("/login/", {"username": "stud", "password": "x"}).status_code, 400)
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher", "home.hashers.TunedPBKDF2PasswordHasher"])
+    def test_login_rehashes_with_the_preferred_hasher(self):
+        self.assertEqual(self.client.post("/login/", {"username": "stud", "password": "stud"}).status_code, 200)
+        self.assertTrue(User.objects.get(username="stud").password.startswith("md5$"))
+
+
+class StudentListingTest(Fixtures, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        for n in range(5):
+            self.make_student(f"s{n}", sem="1" if n % 2 else "3", first_name="Asha" if n == 3 else "")
+        self.hod = self.make_hod()
+        self.client = self.authenticate(self.hod, APIClient())
+
+    def test_unpaginated_list_is_unchanged(self):
+        self.assertEqual(len(self.client.get("/students/").data), 5)
+
+    def test_cursor_pages_filters_and_fields(self):
+        page = self.client.get("/students/", {"limit": 2, "fields": "id,username"}).data
+        self.assertEqual([s["username"] for s in page["results"]], ["s0", "s1"])
+        self.assertEqual(set(page["results"][0]), {"id", "username"})
+        page = self.client.get(page["next"]).data
+        self.assertEqual([s["username"] for s in page["results"]], ["s2", "s3"])
+
+        self.assertEqual([s["username"] for s in self.client.get("/students/", {"sem": "1"}).data], ["s1", "s3"])
+        self.assertEqual([s["username"] for s in self.client.get("/students/", {"search": "ash"}).data], ["s3"])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({"batch": "abc"}, {"program": "x"}, {"sem": "99"}):
+            self.assertEqual(self.client.get("/students/", params).status_code, 400)
+            self.assertEqual(self.client.get("/hodDash/", params).status_code, 400)
+            self.assertEqual(self.client.get("/students/", {**params, "stream": "json"}).status_code, 400)
+
+    @override_settings(CBCS_STREAM_CHUNK_SIZE=2)
+    def test_streamed_listings_match_regular_responses(self):
+        listing = self.client.get("/students/", {"fields": "id,username"}).data
+        response = self.client.get("/students/", {"fields": "id,username", "stream": "json"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), listing)
+
+        response = self.client.get("/students/", {"stream": "ndjson", "sem": "3"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["username"] for line in lines], ["s0", "s2", "s4"])
+
+        dashboard = self.client.get("/hodDash/", {"stream": "json"})
+        self.assertEqual(len(json.loads(b"".join(dashboard.streaming_content))["students"]), 5)
+
+
+class ReportExportTest(Fixtures, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        courses = [self.make_course(f"C{i}") for i in range(2)]
+        for n in range(2):
+            report = models.SemReport.objects.create(student=self.make_student(f"s{n}"), semester="1")
+            enrollment.enroll_courses(report, [course.pk for course in courses[: n + 1]])
+        self.hod = self.make_hod()
+        self.client = self.authenticate(self.hod, APIClient())
+
+    def test_csv_has_one_row_per_enrolled_course(self):
+        response = self.client.get("/hod/export/", {"filetype": "csv", "sem": "1"})
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([(row["Username"], row["Course Code"]) for row in rows], [("s0", "C0"), ("s1", "C0"), ("s1", "C1")])
+        self.assertEqual(rows[0]["Batch Start Year"], "2023")
+
+    def test_xlsx_round_trips_through_the_student_importer(self):
+        response = self.client.get("/hod/export/")
+        upload = SimpleUploadedFile("reports.xlsx", b"".join(response.streaming_content))
+        rows = list(importers.read_rows(upload))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["Semester (number)"], "1")
+
+        models.Student.objects.all().delete()
+        department, program = models.Department.objects.get(), models.Program.objects.get()
+        result = importers.StudentImporter(department, program).run(rows)
+        self.assertEqual([entry["id"] for entry in result["success"]], ["s0", "s1"])
+        self.assertEqual(result["error"], [])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({"batch": "abc"}, {"sem": "99"}, {"filetype": "pdf"}):
+            self.assertEqual(self.client.get("/hod/export/", params).status_code, 400)
+
+
+class SemesterHistoryTest(Fixtures, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.student = self.make_student()
+        self.hod = self.make_hod()
+        self.client = APIClient()
+
+    def add_semesters(self, semesters, courses_per_semester):
+        for sem in semesters:
+            report = models.SemReport.objects.create(student=self.student, semester=sem)
+            for i in range(courses_per_semester):
+                course = self.make_course(f"S{sem}C{i}", semester=sem, courseCredit=1)
+                report.enrolled_courses.add(models.CourseStatus.objects.create(course=course, status="Enrolled", semester=sem))
+
+    def get(self, user, url, **params):
+        self.authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_is_flat_in_semesters_and_courses(self):
+        self.add_semesters(["1"], 1)
+        _, small = self.get(self.hod, f"/getdetails/{self.student.pk}/")
+        self.add_semesters(["2", "3", "4"], 5)
+        response, large = self.get(self.hod, f"/getdetails/{self.student.pk}/")
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data["report"]), 4)
+        self.assertEqual(len(response.data["student"]["enrolled_courses"]), 1)
+
+        _, own = self.get(self.student, "/getdetails/")
+        self.assertEqual(own, large)
+
+    def test_semester_filter(self):
+        self.add_semesters(["1", "2", "3"], 2)
+        response, _ = self.get(self.student, "/getdetails/", semester="2")
+        self.assertEqual([report["semester"] for report in response.data["report"]], ["2"])
+        self.assertEqual(
+            [item["course"]["code"] for item in response.data["student"]["enrolled_courses"]], ["S1C0", "S1C1"]
+        )
+
+
+class ReportReviewTest(Fixtures, TestCase):
+    def setUp(self):
+        department = self.make_department()
+        other = self.make_department("ECE")
+        self.batch = self.make_batch()
+        self.reports = []
+        for n, dep in enumerate([department] * 4 + [other]):
+            student = self.make_student(f"s{n}", self.make_program(dep, f"P{n}"))
+            self.reports.append(models.SemReport.objects.create(student=student, semester="1"))
+        models.SemReport.objects.filter(pk=self.reports[3].pk).update(is_approved=True)
+        self.hod = self.make_hod(department)
+        self.client = self.authenticate(self.hod, APIClient())
+
+    def test_queue_lists_pending_reports_of_the_department(self):
+        self.assertEqual(self.reports[4].department.name, "ECE")
+        page = self.client.get("/hod/reviews/", {"limit": 2}).data
+        self.assertEqual([r["username"] for r in page["results"]], ["s0", "s1"])
+        page = self.client.get(page["next"]).data
+        self.assertEqual([r["username"] for r in page["results"]], ["s2"])
+
+    def test_bulk_review_updates_in_one_statement(self):
+        ids = [report.pk for report in self.reports]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/hod/reviews/", {"reports": ids[:2], "aproved": True}, format="json")
+        self.assertEqual(response.data, {"updated": 2, "skipped": []})
+        self.assertEqual(sum(q["sql"].startswith("UPDATE") for q in ctx.captured_queries), 1)
+
+        response = self.client.post("/hod/reviews/", {"reports": ids, "aproved": False, "ror": "Too few credits"}, format="json")
+        self.assertEqual(response.data, {"updated": 1, "skipped": [ids[0], ids[1], ids[3], ids[4]]})
+        self.assertEqual(list(models.SemReport.objects.pending().values_list("pk", flat=True)), [ids[4]])
+
+
+class SemReportCreationTest(Fixtures, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.student = self.make_student()
+
+    def test_get_or_create_for_is_idempotent(self):
+        report = models.SemReport.objects.get_or_create_for(self.student, "1")
+        self.assertEqual(report.department_id, self.student.department_id)
+        self.assertEqual(models.SemReport.objects.get_or_create_for(self.student, "1").pk, report.pk)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.SemReport.objects.create(student=self.student, semester="1")
+
+
+@skipUnless(connection.vendor == "postgresql", "needs concurrent connections to PostgreSQL")
+class SemReportConcurrencyTest(Fixtures, TransactionTestCase):
+    threads = 16
+
+    def test_concurrent_dashboard_requests_create_one_report(self):
+        self.make_catalog()
+        student = self.make_student()
+        barrier = threading.Barrier(self.threads)
+
+        def hit():
+            client = self.authenticate(student, APIClient())
+            try:
+                barrier.wait()
+                return client.get("/studDash/").status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(self.threads) as pool:
+            codes = list(pool.map(lambda _: hit(), range(self.threads)))
+        self.assertEqual(codes, [200] * self.threads)
+        self.assertEqual(models.SemReport.objects.filter(student=student).count(), 1)
+
+
+class QueryInstrumentationTest(Fixtures, TestCase):
+    def setUp(self):
+        self.hod = self.make_hod(self.make_department())
+
+    def get(self):
+        return self.authenticate(self.hod, APIClient()).get("/students/")
+
+    def test_disabled_by_default(self):
+        self.assertNotIn("Server-Timing", self.get())
+
+    @override_settings(CBCS_QUERY_INSTRUMENTATION=True, CBCS_SLOWEST_QUERIES=2, CBCS_SLOW_REQUEST_QUERIES=1)
+    def test_reports_queries_and_flags_thresholds(self):
+        with self.assertLogs("home.middleware", "INFO") as logs:
+            response = self.get()
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, "WARNING")
+        self.assertEqual(record["path"], "/students/")
+        self.assertGreater(record["queries"], 1)
+        self.assertEqual(record["flags"], ["queries"])
+        self.assertEqual(len(record["slowest"]), 2)
+
+
+class ProfilingMiddlewareTest(Fixtures, TestCase):
+    def setUp(self):
+        self.hod = self.make_hod(self.make_department())
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        caches["default"].delete("profile:last")
+
+    def get(self, url, **headers):
+        return self.authenticate(self.hod, APIClient()).get(url, headers=headers)
+
+    def test_profiles_authorized_requests_once_per_interval(self):
+        with override_settings(CBCS_PROFILE_TOKEN="secret", CBCS_PROFILE_DIR=self.directory.name), self.assertLogs("home.middleware"):
+            self.assertNotIn("X-CBCS-Profile", self.get("/hodDash/", X_CBCS_Profile="wrong"))
+            self.assertNotIn("X-CBCS-Profile", self.get("/hodDash/?profile=%C3%A9"))
+            self.assertNotIn("X-CBCS-Profile", self.get("/students/", X_CBCS_Profile="secret"))
+            response = self.get("/hodDash/?profile=secret&limit=5")
+            self.assertNotIn("X-CBCS-Profile", self.get("/hodDash/", X_CBCS_Profile="secret"))
+
+        name = response["X-CBCS-Profile"]
+        trace_name = os.path.splitext(name)[0] + ".sql.json"
+        self.assertEqual(sorted(os.listdir(self.directory.name)), sorted([name, trace_name]))
+        with open(os.path.join(self.directory.name, trace_name)) as trace:
+            trace = json.load(trace)
+        self.assertEqual(trace["view"], "HodDashBoard")
+        self.assertEqual(trace["path"], "/hodDash/?limit=5")
+        self.assertEqual(trace["queries"], len(trace["statements"]))
@@ -19,5 +19,9 @@ urlpatterns = [
     path("courseblukregister/",views.CourseUploadBluk.as_view(),name="course-register-bluk",),
     path("studDash/",views.studDashBoard,name="Student Dashboard"),
     path("hodDash/",views.HodDashBoard,name="HOD Dashboard"),
+    path("hod/reviews/",views.reviewReports,name="Review Reports"),
+    path("hod/export/",views.exportReports,name="Export Reports"),
+    path("jobs/<int:pk>/",views.importJobStatus,name="Import Job Status"),
+    path("dbstats/",views.dbStats,name="Database Stats"),
     # path("fake/",views.fake,name="fake"),
 ]
\ No newline at end of file
@@ -1,16 +1,14 @@
-import pandas as pd
 from django.shortcuts import render
-from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework.views import APIView
 from rest_framework import generics,status
-from . import models, serializers,urls,utils
+from . import authentication, cache, database, enrollment, exports, importers, jobs, models, pagination, permissions, rules, serializers, streaming, urls,utils
 from rest_framework.response import Response
+from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
-from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate,login
-from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import api_view,permission_classes
-from rest_framework.permissions import AllowAny,IsAuthenticated
+from rest_framework.permissions import AllowAny,IsAdminUser,IsAuthenticated
 
 # Create your views here.
 
@@ -33,18 +31,13 @@ class Login(APIView):
     def post(self, request):
         username = request.data.get("username")
         password = request.data.get("password")
-        user = authenticate(username=username, password=password)
-        if user is not None:
+        credentials = authentication.login(username, password)
+        if credentials is not None:
+            user, token = credentials
             cont = {}
-            if models.HOD.objects.filter(username=username).exists():
-                cont['user_type'] = 'HOD'
-            elif models.Student.objects.filter(username=username).exists():
-                cont['user_type'] = 'Student'
-            else:
-                cont['user_type'] = 'Admin'
-            
-            token, created = Token.objects.get_or_create(user=user)
+            cont['user_type'] = user.role
             cont['token'] = token.key
+            cont['expires'] = token.expires
             cont['id'] = user.id
             cont['username'] = user.username
             return Response(cont, status=status.HTTP_200_OK)
@@ -59,7 +52,7 @@ class HODRegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        if models.HOD.objects.filter(username=request.user.username).exists() or models.Student.objects.filter(username=request.user.username).exists():
+        if not authentication.is_admin(request.user):
             return Response({"error": "Only Admins can create a HOD."}, status=status.HTTP_403_FORBIDDEN)
 
         try:
@@ -78,7 +71,7 @@ class HODRegisterView(generics.CreateAPIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     def get(self, request, *args, **kwargs):
-        if not (models.HOD.objects.filter(username=request.user.username).exists() or models.Student.objects.filter(username=request.user.username).exists()):
+        if authentication.is_admin(request.user):
             hods = models.HOD.objects.all()
             serial = self.get_serializer(hods, many=True)
             return Response(serial.data)
@@ -91,7 +84,7 @@ class StudentRegisterView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def create(self, request, *args, **kwargs):
-        if not models.HOD.objects.filter(username=request.user.username).exists():
+        if not authentication.is_hod(request.user):
             return Response({"error": "You are not authorized to create a student."}, status=status.HTTP_403_FORBIDDEN)
         
         serializer = self.get_serializer(data=request.data)
@@ -115,25 +108,35 @@ class StudentRegisterView(generics.CreateAPIView):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def getStudents(request):
-    if request.method == "GET" and models.HOD.objects.filter(username=request.user.username).exists():
-        hod = models.HOD.objects.get(username=request.user.username)
-        students = models.Student.objects.all().filter(department=hod.department)
-        serializer = serializers.StudentSerializer(students, many=True)
-        return Response(serializer.data)
+    if request.method == "GET" and authentication.is_hod(request.user):
+        hod = request.user.hod
+        students = models.Student.objects.filter(department=hod.department)
+        if streaming.stream_format(request):
+            return streaming.response(request, streaming.student_rows(request, students))
+        return Response(pagination.student_listing(request, students))
     
-    if request.method == "GET" and models.Student.objects.filter(username=request.user.username).exists():
-        student = models.Student.objects.get(username=request.user.username)
+    if request.method == "GET" and authentication.is_student(request.user):
+        student = request.user.student
         serial = serializers.StudentSerializer(student)
         return Response(serial.data)
     
 
+def department_courses(department_id, semester=None):
+    """Cached CourseSerializer data for a department, optionally for one semester."""
+    def build():
+        courses = models.Course.objects.filter(department_id=department_id).select_related("program__department")
+        if semester is not None:
+            courses = courses.filter(semester=semester)
+        return serializers.CourseSerializer(courses, many=True).data
+    return cache.cached_response("courses", [department_id, semester or "all"], build)
+
 class CourseView(generics.ListCreateAPIView):
     queryset = models.Course.objects.all()
     serializer_class = serializers.CourseSerializer
     permission_classes = [IsAuthenticated]
     
     def post(self, request, *args, **kwargs):
-        if models.HOD.objects.filter(username=request.user.username).exists():
+        if authentication.is_hod(request.user):
             course = serializers.CourseSerial(data=request.data)
             if course.is_valid():
                 course.save(department=request.user.hod.department)
@@ -142,19 +145,20 @@ class CourseView(generics.ListCreateAPIView):
         return Response({"error": "You are not authorized to view courses."}, status=status.HTTP_403_FORBIDDEN)
         
     def get(self, request, *args, **kwargs):
-        if models.HOD.objects.filter(username=request.user.username).exists():
-            courses = models.Course.objects.filter(department=request.user.hod.department)
-            return Response(serializers.CourseSerializer(courses, many=True).data)
+        if authentication.is_hod(request.user):
+            return Response(department_courses(request.user.hod.department_id))
         return Response({"error": "You are not authorized to view courses."}, status=status.HTTP_403_FORBIDDEN)
 
 @api_view(['GET',"POST"])
 @permission_classes([IsAuthenticated])
 def selectCourses(request,sem):
-    if request.method == "GET" and models.Student.objects.filter(username=request.user.username).exists():
-        stud = models.Student.objects.get(username=request.user.username)
+    if request.method == "GET" and authentication.is_student(request.user):
+        stud = authentication.fresh_student(request.user)
         studSerial = serializers.StudentSerializer(stud)
         enrolled_courses = serializers.CourseItemSerial(stud.enrolled_courses,many=True)
-        avail_courses = serializers.CourseSerializer(models.Course.objects.filter(department=stud.department).filter(program = stud.program).filter(semester=sem),many=True)
+        # Same course set enroll_courses accepts (program, batch and semester)
+        eligible = rules.eligible_courses(stud.program_id, stud.batch_id, sem)
+        avail_courses = serializers.CourseSerializer(models.Course.objects.filter(pk__in=list(eligible)).select_related("program__department"),many=True)
         
         cont = {
             "student":studSerial.data,
@@ -163,25 +167,14 @@ def selectCourses(request,sem):
         }
         return Response(cont)
     
-    if request.method == "POST" and models.Student.objects.filter(username=request.user.username).exists():
+    if request.method == "POST" and authentication.is_student(request.user):
         courselist = request.data['CourseIDs']
-        stud = models.Student.objects.get(username=request.user.username)
+        stud = authentication.fresh_student(request.user)
         studSerial = serializers.StudentSerializer(stud)
-        semRep,created = models.SemReport.objects.get_or_create(student=stud,semester=stud.sem)
-        errors = []
-        
-        for courseID in courselist:
-            cours = models.Course.objects.get(pk=courseID)
-            if not stud.enrolled_courses.filter(course=cours,status="Enrolled",semester=stud.sem).exists():
-                coursItem = models.CourseStatus(course=cours,status="Enrolled",semester=stud.sem)
-                coursItem.save()
-                stud.enrolled_courses.add(coursItem)
-                semRep.courses.add(coursItem)
-                stud.save()
-                semRep.save()
-            else:
-                errors.append(str(cours.name)+" Already Enrolled")
-                
+        semRep = models.SemReport.objects.get_or_create_for(stud, stud.sem)
+        try: _, errors = enrollment.enroll_courses(semRep, courselist, stud)
+        except PermissionDenied as e: return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
+
         semserial = serializers.ReportSerial(semRep)
         cont = {
             "report":semserial.data,
@@ -191,57 +184,43 @@ def selectCourses(request,sem):
         }
         return Response(cont)
 
+def semesterHistory(request, pk):
+    """Student details with their semester reports; ``?semester=`` limits the reports to one semester."""
+    semester = request.query_params.get("semester")
+    student = get_object_or_404(models.Student.objects.with_history(semester), pk=pk)
+    reports = [r for r in student.semester_reports if not semester or r.semester == semester]
+    return {
+        "student":serializers.StudentSendSerial(student).data,
+        "sem":student.sem,
+        "department":student.department.name,
+        "program":student.program.name,
+        "report":serializers.ReportSerial(reports,many=True).data,
+    }
+
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, permissions.IsStudent])
 def getUpSemWithStudDetail(request):
     if request.method=="GET":
-        student = models.Student.objects.get(username=request.user.username)
-        studSerial = serializers.StudentSendSerial(student)
-        semRep = models.SemReport.objects.filter(student=student)
-        semSerial = serializers.ReportSerial(semRep,many=True)
-        cont = {
-            "student":studSerial.data,
-            "sem":student.sem,
-            "department":student.department.name,
-            "program":student.program.name,
-            "report":semSerial.data,
-        }
-        return Response(cont)
+        return Response(semesterHistory(request, request.user.pk))
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, permissions.IsHOD])
 def getUpSemWithStudDetailHOD(request,sid):
     if request.method=="GET":
-        student = models.Student.objects.get(pk=sid)
-        studSerial = serializers.StudentSendSerial(student)
-        semRep = models.SemReport.objects.filter(student=student)
-        semSerial = serializers.ReportSerial(semRep,many=True)
-        cont = {
-            "student":studSerial.data,
-            "sem":student.sem,
-            "department":student.department.name,
-            "program":student.program.name,
-            "report":semSerial.data,
-        }
-        return Response(cont)
+        return Response(semesterHistory(request, sid))
         
 @api_view(["GET","POST"])
 @permission_classes([IsAuthenticated])
 def getCourses(request):
-    if request.method == "GET" and models.HOD.objects.filter(username=request.user.username).exists():
-        hod = models.HOD.objects.get(username=request.user.username)
-        courses = models.Course.objects.filter(department=hod.department)
-        serial = serializers.CourseSerializer(courses,many=True)
-        return Response(serial.data)
+    if request.method == "GET" and authentication.is_hod(request.user):
+        return Response(department_courses(request.user.hod.department_id))
     
-    if request.method == "GET" and models.Student.objects.filter(username=request.user.username).exists():
-        student = models.Student.objects.get(username=request.user.username)
-        courses = models.Course.objects.filter(department=student.department,semester=student.sem)
-        serial = serializers.CourseSerializer(courses,many=True)
-        return Response(serial.data)
+    if request.method == "GET" and authentication.is_student(request.user):
+        student = request.user.student
+        return Response(department_courses(student.department_id, student.sem))
     
-    if request.method == "POST" and models.Student.objects.filter(username=request.user.username).exists():
-        student = models.Student.objects.get(username=request.user.username)
+    if request.method == "POST" and authentication.is_student(request.user):
+        student = request.user.student
         ids = [x['id'] for x in request.data[0]]
         print(ids)
         for i in ids:
@@ -252,40 +231,44 @@ def getCourses(request):
         return Response("HI")
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, permissions.IsHOD])
 def programs(request):
     if request.method == "GET":
-        programs = models.Program.objects.filter(department=request.user.hod.department)
-        return Response(serializers.ProgramSerial(programs, many=True).data)
+        department_id = request.user.hod.department_id
+        return Response(cache.cached_response("programs", [department_id], lambda: serializers.ProgramSerial(
+            models.Program.objects.filter(department_id=department_id).select_related("department"), many=True
+        ).data))
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, permissions.IsHOD])
 def adminDashBoard(request):
     if request.method == "GET":
-        user = models.HOD.objects.get(username=request.user.username)
-        programs = models.Program.objects.filter(department=user.department)
-        pserial = serializers.ProgramSerial(programs,many=True)
-        department = models.Department.objects.all()
-        batch = models.Batch.objects.all()
-        aprograms = models.Program.objects.all()
-        apserial = serializers.ProgramSerial(aprograms,many=True)
-        batchSerial = serializers.BatchSerializer(batch,many=True)
-        departSerial = serializers.DepartmentSerializer(department,many=True)
-        cont = {
-            "programs":pserial.data,
-            "allprograms":apserial.data,
-            "department": user.department.name,
-            "batch":batchSerial.data,
-            "availDepart":departSerial.data,
-        }
-        return Response(cont)
+        user = request.user.hod
+        return Response(cache.cached_response("adminDashBoard", [user.department_id], lambda: adminDashBoardData(user)))
+
+def adminDashBoardData(user):
+    programs = models.Program.objects.filter(department_id=user.department_id).select_related("department")
+    pserial = serializers.ProgramSerial(programs,many=True)
+    department = models.Department.objects.all()
+    batch = models.Batch.objects.with_student_counts()
+    aprograms = models.Program.objects.select_related("department")
+    apserial = serializers.ProgramSerial(aprograms,many=True)
+    batchSerial = serializers.BatchSerializer(batch,many=True)
+    departSerial = serializers.DepartmentSerializer(department,many=True)
+    return {
+        "programs":pserial.data,
+        "allprograms":apserial.data,
+        "department": user.department.name,
+        "batch":batchSerial.data,
+        "availDepart":departSerial.data,
+    }
 
 
 
     
 class StudentRegisterBulk(generics.CreateAPIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, permissions.IsHOD]
     serializer_class = serializers.StudentUploadSerializer
     
     def create(self, request, *args, **kwargs):
@@ -294,47 +277,21 @@ class StudentRegisterBulk(generics.CreateAPIView):
 
         uploaded_file = request.FILES['file']
 
-        # Check if the uploaded file is an Excel file
-        if not uploaded_file.name.endswith(('.xlsx', '.xls')):
-            return Response({"error": "Uploaded file is not an Excel file."}, status=status.HTTP_400_BAD_REQUEST)
+        # Check if the uploaded file is an Excel or CSV file
+        if not uploaded_file.name.endswith(('.xlsx', '.xls', '.csv')):
+            return Response({"error": "Uploaded file is not an Excel or CSV file."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Read the Excel file into a DataFrame
-            df = pd.read_excel(uploaded_file)
             program = models.Program.objects.get(pk=request.data['program'])
             department = models.Department.objects.get(pk=request.user.hod.department.id)
             
-            # Process each record in the DataFrame
-            message = {"success": [], "error": []}
-            for index, row in df.iterrows():
-                itm = row.to_dict()
-                batch_obj = models.Batch.objects.get(
-                    start_year__year=int(itm["Batch Start Year"]),
-                    end_year__year=int(itm["Batch End Year"])
-                )
-                data = {
-                    "username": itm['Username'],
-                    "email": itm["email"],
-                    "department": department.id,
-                    "program": program.id,
-                    "batch": batch_obj.id,
-                    "sem": itm['Semester (number)'],
-                    "first_name": itm["first_name"],
-                    "last_name": itm["last_name"],
-                    "enrolled_courses": [],
-                    "password": itm["Username"],
-                    "joined_date": itm["DOJ"]
-                }
-                try:
-                    studSerial = serializers.StudentSerializer(data=data)
-                    if studSerial.is_valid(raise_exception=True):  # Pass raise_exception=True for automatic validation errors
-                        print("yes Valid")
-                        studSerial.save()
-                        message['success'].append({"id": itm["Username"], "message": "Student Created"})
-                except IntegrityError as e:  # Catching IntegrityError for unique constraints
-                    message['error'].append({"id": itm["Username"], "error": str(e)})
-                except Exception as e:  # Catching other exceptions
-                    message['error'].append({"id": itm["Username"], "error": str(e)})
+            if jobs.wants_background(request):
+                job = jobs.enqueue(models.ImportJob.STUDENTS, uploaded_file, request.user, department, program=program.pk)
+                return Response({"message": "File queued for processing.", "job": job.pk}, status=status.HTTP_202_ACCEPTED)
+
+            # Rows are streamed and written in chunks, see importers.StudentImporter
+            importer = importers.StudentImporter(department, program)
+            message = importer.run(importers.read_rows(uploaded_file))
 
             return Response({"message": "File processed successfully.", "details": message}, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -342,7 +299,7 @@ class StudentRegisterBulk(generics.CreateAPIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class CourseUploadBluk(generics.CreateAPIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, permissions.IsHOD]
     serializer_class = serializers.CourseUploadSerializer
     
     def create(self, request, *args, **kwargs):
@@ -356,34 +313,12 @@ class CourseUploadBluk(generics.CreateAPIView):
             return Response({"error": "Uploaded file is not an Excel file."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Read the Excel file into a DataFrame
-            df = pd.read_excel(uploaded_file)
             department = models.Department.objects.get(pk=request.user.hod.department.id)
-            
-            # Process each record in the DataFrame
-            message = {"success": [], "error": []}
-            for index, row in df.iterrows():
-                itm = row.to_dict()
-                data = {
-                    "name": itm['Course Name'],
-                    "code": itm["Course Code"],
-                    "is_optional": itm["Optional"],
-                    "courseCredit": itm["Credit"],
-                    "semester": itm["Semester"],
-                    "department": department.id,
-                    "program": itm["Program"]
-                }
-                try:
-                    courseSerial = serializers.CourseSerial(data=data)
-                    if courseSerial.is_valid(raise_exception=True):  # Pass raise_exception=True for automatic validation errors
-                        print("yes Valid")
-                        courseSerial.save()
-                        message['success'].append({"id": itm["Course Code"], "message": "Course Created"})
-                except IntegrityError as e:  # Catching IntegrityError for unique constraints
-                    message['error'].append({"id": itm["Course Code"], "error": str(e)})
-                except Exception as e:  # Catching other exceptions
-                    message['error'].append({"id": itm["Course Code"], "error": str(e)})
+            if jobs.wants_background(request):
+                job = jobs.enqueue(models.ImportJob.COURSES, uploaded_file, request.user, department)
+                return Response({"message": "File queued for processing.", "job": job.pk}, status=status.HTTP_202_ACCEPTED)
 
+            message = importers.CourseImporter(department).run(importers.read_rows(uploaded_file))
             return Response({"message": "File processed successfully.", "details": message}, status=status.HTTP_201_CREATED)
         except Exception as e: return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
@@ -391,12 +326,18 @@ class CourseUploadBluk(generics.CreateAPIView):
 @api_view(["GET"])
 def fake(request):
     studentdata = utils.students
+    students = []
     for data in studentdata:
         serializer = serializers.StudentSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            students.append(models.Student(**serializer.validated_data))
         else:
             print(serializer.errors)
+    with importers.PasswordHashPool() as hasher:
+        for student, password in zip(students, hasher.hash([s.password for s in students])):
+            student.password = password
+    models.Student.objects.bulk_create_students(students)
+    cache.invalidate_catalog()
     return Response("Fake")
 
 
@@ -411,8 +352,10 @@ def fake(request):
 from icecream import ic
 
 @api_view(["GET","POST"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, permissions.IsStudent])
 def studDashBoard(request):
+    # The authenticated user may come from the token cache; work on the current semester, program and batch
+    authentication.fresh_student(request.user)
     if request.method == "GET":
         cont = {}
         cont['department'] = request.user.student.department.name
@@ -422,13 +365,12 @@ def studDashBoard(request):
         cont['last_name'] = request.user.student.last_name
         cont['username'] = request.user.student.username
         cont['current_sem'] = request.user.student.sem
-        cur_report, _ = models.SemReport.objects.get_or_create(student=request.user.student,semester=request.user.student.sem)
+        cur_report = models.SemReport.objects.get_or_create_for(request.user.student, request.user.student.sem)
         cont['enrolled_courses'] = serializers.CourseItemSerial(cur_report.enrolled_courses,many=True).data
         enrolled_course_ids = cur_report.enrolled_courses.values_list('course_id', flat=True)
-        avail_courses = models.Course.objects.filter(
-            department=request.user.student.department,
-            program=request.user.student.program
-        ).exclude(id__in=enrolled_course_ids)
+        # Same course set enroll_courses accepts (program, batch and semester)
+        eligible = rules.eligible_courses(request.user.student.program_id, request.user.student.batch_id, cur_report.semester)
+        avail_courses = models.Course.objects.filter(pk__in=list(eligible)).exclude(id__in=enrolled_course_ids).select_related("program__department")
         cont['avail_courses'] = serializers.CourseSerializer(avail_courses, many=True).data
         rep = models.SemReport.objects.filter(student=request.user.student)
         cont['report'] = serializers.ReportSerial(rep,many=True).data
@@ -440,25 +382,14 @@ def studDashBoard(request):
         cont = {}
         cont['errors'] = []
         cont['message'] = []
-        report, created = models.SemReport.objects.get_or_create(student=request.user.student, semester=request.user.student.sem)
+        report = models.SemReport.objects.get_or_create_for(request.user.student, request.user.student.sem)
         
         if report.is_approved:
             return Response({"error": "Cannot modify an approved report."}, status=status.HTTP_403_FORBIDDEN)
         
-        for course_id in courselist:
-            try:
-                course = models.Course.objects.get(pk=course_id)
-                if report.enrolled_courses.filter(course=course).exists():
-                    cont['errors'].append(f"{course.name} is already enrolled.")
-                else:
-                    course_status = models.CourseStatus(course=course, status="Enrolled", semester=request.user.student.sem)
-                    course_status.save()
-                    report.enrolled_courses.add(course_status)
-                    report.reason_for_rejection = ""
-                    report.save()
-                    cont['message'].append(f"{course.name} enrolled successfully.")
-            except models.Course.DoesNotExist: cont['errors'].append(f"Course with ID {course_id} does not exist.")
-            except Exception as e: cont['errors'].append(str(e))
+        try: cont['message'], cont['errors'] = enrollment.enroll_courses(report, courselist, request.user.student)
+        except PermissionDenied as e: return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except Exception as e: cont['errors'].append(str(e))
         return Response(cont, status=status.HTTP_200_OK if not cont['errors'] and cont['message'] else status.HTTP_206_PARTIAL_CONTENT if cont['errors'] and cont['message'] else status.HTTP_400_BAD_REQUEST)
     
     if request.method == "POST" and request.data.get('type') == "unenroll" and request.data.get("type") != "enroll":
@@ -467,38 +398,44 @@ def studDashBoard(request):
         cont = {}
         cont['errors'] = []
         cont['message'] = []
-        report, created = models.SemReport.objects.get_or_create(student=request.user.student, semester=request.user.student.sem)
+        report = models.SemReport.objects.get_or_create_for(request.user.student, request.user.student.sem)
         
         if report.is_approved: return Response({"error": "Cannot modify an approved report."}, status=status.HTTP_403_FORBIDDEN)
         
-        for course_id in courselist:
-            try:
-                course = models.Course.objects.get(pk=course_id)
-                course_status = report.enrolled_courses.filter(course=course).first()
-                if course_status:
-                    course_status.delete()
-                    cont['message'].append(f"{course.name} unenrolled successfully.")
-                else: cont['errors'].append(f"{course.name} is not enrolled.")
-            except models.Course.DoesNotExist: cont['errors'].append(f"Course with ID {course_id} does not exist.")
-            except Exception as e: cont['errors'].append(str(e))
+        cont['missing'] = []
+        try: cont['message'], cont['errors'], cont['missing'] = enrollment.unenroll_courses(report, courselist)
+        except PermissionDenied as e: return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except Exception as e: cont['errors'].append(str(e))
         return Response(cont, status=status.HTTP_200_OK if not cont['errors'] and cont['message'] else status.HTTP_206_PARTIAL_CONTENT if cont['errors'] and cont['message'] else status.HTTP_400_BAD_REQUEST)
     else: return Response("Invalid Request [post data must have type]", status=status.HTTP_406_NOT_ACCEPTABLE)
     
 
 @api_view(["GET","POST","PUT"])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, permissions.IsHOD])
 def HodDashBoard(req):
     if req.method == "GET":
         cont = {}
-        cont['department'] = req.user.hod.department.name
-        cont['username'] = req.user.hod.username
-        cont['first_name'] = req.user.hod.first_name
-        cont['last_name'] = req.user.hod.last_name
-        cont['email'] = req.user.hod.email
-        cont['programs'] = serializers.ProgramSerial(req.user.hod.department.get_programs(), many=True).data
-        cont['students'] = serializers.StudentSerializer(models.Student.objects.filter(department=req.user.hod.department), many=True).data
-        cont['courses'] = serializers.HodCourseSerial(models.Course.objects.filter(department=req.user.hod.department), many=True).data
-        cont['batchs'] = serializers.BatchSerializer(models.Batch.objects.all(), many=True).data
+        hod = req.user.hod
+        department = hod.department
+        batches = models.Batch.objects.with_student_counts()
+        programs = department.get_programs().select_related("department")
+        students = models.Student.objects.filter(department=department)
+        courses = models.Course.objects.filter(department=department).select_related("program__department").prefetch_related(Prefetch("batch", queryset=batches))
+        cont['department'] = department.name
+        cont['username'] = hod.username
+        cont['first_name'] = hod.first_name
+        cont['last_name'] = hod.last_name
+        cont['email'] = hod.email
+        cont['programs'] = serializers.ProgramSerial(programs, many=True).data
+        if streaming.stream_format(req):
+            # Students and courses are written out chunk by chunk
+            cont['students'] = streaming.student_rows(req, students)
+            cont['courses'] = streaming.serialize_rows(courses.order_by("pk"), serializers.HodCourseSerial)
+            cont['batchs'] = serializers.BatchSerializer(batches, many=True).data
+            return streaming.response(req, cont)
+        cont['students'] = pagination.student_listing(req, students)
+        cont['courses'] = serializers.HodCourseSerial(courses, many=True).data
+        cont['batchs'] = serializers.BatchSerializer(batches, many=True).data
         return Response(cont, status=status.HTTP_200_OK)
 
     if req.method == "POST" and req.data.get("type") == "BulkCourseUpload":
@@ -508,30 +445,13 @@ def HodDashBoard(req):
         try:
             if not hasattr(req.user, 'hod') or not getattr(req.user.hod, 'department', None): return Response({"error": "You do not have a valid HOD or department."}, status=status.HTTP_403_FORBIDDEN)
             
-            df = pd.read_excel(xl, sheet_name='Sheet1')
-            message = {"success": [], "error": []}
-            for _, row in df.iterrows():
-                itm = row.to_dict()
-                batch_obj = models.Batch.objects.get(
-                    start_year__year=int(itm["Batch Start Year"]),
-                    end_year__year=int(itm["Batch End Year"])
-                )
-                data = {
-                    "name": itm["Subject Name"],
-                    "code": itm["Subject Code"],
-                    "courseCredit": itm["Course Credit"],
-                    "semester": itm["Semester (number)"],
-                    "batch": [batch_obj.id],
-                    "department": models.Department.objects.get(pk=req.user.hod.department.id).id,
-                    "program": models.Program.objects.get(pk=itm["Program"]).id
-                }
-                try:
-                    courseSerial = serializers.BulkUploadCourses(data=data)
-                    if courseSerial.is_valid(raise_exception=True):
-                        courseSerial.save()
-                        message['success'].append(f"{itm['Subject Name']} created successfully.")
-                except IntegrityError as e: message['error'].append(f"{itm['Subject Name']} already exists.")
-                except Exception as e: message['error'].append(f'{itm["Subject Name"]}: {str(e)}')
+            department = req.user.hod.department
+            if jobs.wants_background(req):
+                job = jobs.enqueue(models.ImportJob.CURRICULUM, xl, req.user, department)
+                return Response({"message": "File queued for processing.", "job": job.pk}, status=status.HTTP_202_ACCEPTED)
+
+            importer = importers.CurriculumImporter(department)
+            message = importer.run(importers.read_rows(xl, sheet_name=importer.sheet_name))
             return Response({"message": "File processed successfully.", "details": message}, status=status.HTTP_201_CREATED)
         except Exception as e: return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
@@ -555,8 +475,9 @@ def HodDashBoard(req):
             sem_reports = models.SemReport.objects.filter(student__department=hod.department)
             student_ids = sem_reports.values_list('student_id', flat=True).distinct()
             students = models.Student.objects.filter(pk__in=student_ids)
-            serialized = serializers.StudentSerializer(students, many=True)
-            return Response(serialized.data, status=status.HTTP_200_OK)
+            if streaming.stream_format(req):
+                return streaming.response(req, streaming.student_rows(req, students))
+            return Response(pagination.student_listing(req, students), status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -576,4 +497,65 @@ def HodDashBoard(req):
             return Response({"message":"report approved"},status=status.HTTP_200_OK)
         
 
-    else: return Response("Invalid Request", status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    else: return Response("Invalid Request", status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated, permissions.IsHOD])
+def reviewReports(request):
+    department = request.user.hod.department
+    if request.method == "GET":
+        reports = models.SemReport.objects.pending().filter(department=department)
+        if request.query_params.get("semester"):
+            reports = reports.filter(semester=request.query_params["semester"])
+        reports = reports.select_related("student").with_courses()
+        paginator = pagination.ReportCursorPagination()
+        page = paginator.paginate_queryset(reports, request)
+        return paginator.get_paginated_response(serializers.ReviewReportSerial(page, many=True).data)
+
+    # {"reports": [ids], "aproved": true} approves; "aproved": false with "ror" rejects
+    ids = request.data.get("reports") or []
+    approval = request.data.get("aproved")
+    if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids) or approval is None:
+        return Response({"error": "reports (a list of IDs) and aproved are required."}, status=status.HTTP_400_BAD_REQUEST)
+    if approval:
+        changes = {"is_approved": True}
+    else:
+        changes = {"reason_for_rejection": request.data.get("ror") or ""}
+        if not changes["reason_for_rejection"]:
+            return Response({"error": "ror is required to reject reports."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Approved reports, and reports of other departments, are left untouched
+    reports = models.SemReport.objects.filter(pk__in=ids, department=department, is_approved=False)
+    with transaction.atomic():
+        updated = set(reports.select_for_update().values_list("pk", flat=True))
+        models.SemReport.objects.filter(pk__in=updated).update(**changes)
+    skipped = [pk for pk in ids if pk not in updated]
+    return Response({"updated": len(updated), "skipped": skipped}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, permissions.IsHOD])
+def exportReports(request):
+    params = serializers.ReportExportSerial(data=request.query_params)
+    if not params.is_valid():
+        return Response({"error": params.errors}, status=status.HTTP_400_BAD_REQUEST)
+    return exports.export_reports(
+        request.user.hod.department,
+        params.validated_data["filetype"],
+        batch=params.validated_data.get("batch"),
+        semester=params.validated_data.get("sem"),
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def importJobStatus(request, pk):
+    job = get_object_or_404(models.ImportJob, pk=pk, owner=request.user)
+    return Response(serializers.ImportJobSerial(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def dbStats(request):
+    return Response(database.connection_stats(), status=status.HTTP_200_OK)